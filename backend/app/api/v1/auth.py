@@ -3,20 +3,23 @@ Authentication Routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, get_current_user
+from app.core.security import (
+    verify_password, get_password_hash, create_access_token, get_current_user, user_token_claims, invalidate_user_tokens
+)
 from app.models.user import User
 from app.models.tenant import Tenant, TenantUser, RoleEnum
-from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
+from app.schemas.user import UserCreate, UserResponse, UserLogin, PasswordChange, Token
 
 router = APIRouter()
 
 @router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user with a tenant"""
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(select(User).where(User.email == user_data.email))).scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,17 +30,17 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     user = User(
         nome=user_data.full_name,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password)
+        password_hash=await get_password_hash(user_data.password)
     )
     db.add(user)
-    db.flush()  # Get user ID before committing
+    await db.flush()  # Get user ID before committing
     
     # Create tenant for the user
     tenant = Tenant(
         nome=user_data.tenant_name
     )
     db.add(tenant)
-    db.flush()  # Get tenant ID
+    await db.flush()  # Get tenant ID
     
     # Associate user with tenant as owner
     tenant_user = TenantUser(
@@ -46,11 +49,11 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=RoleEnum.owner
     )
     db.add(tenant_user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Generate token
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=user_token_claims(user))
     
     return Token(
         access_token=access_token,
@@ -58,18 +61,18 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login with email and password"""
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = (await db.execute(select(User).where(User.email == credentials.email))).scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await verify_password(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=user_token_claims(user))
     
     return Token(
         access_token=access_token,
@@ -77,6 +80,35 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
     )
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get current user info"""
-    return UserResponse.model_validate(current_user)
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return UserResponse.model_validate(user)
+
+@router.post("/password", response_model=Token)
+async def change_password(
+    data: PasswordChange,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Change the current user's password; every token issued before stops working"""
+    user = await db.get(User, current_user.id)
+    if not user or not await verify_password(data.current_password, user.password_hash):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user.password_hash = await get_password_hash(data.new_password)
+    await invalidate_user_tokens(db, user)
+    
+    return Token(
+        access_token=create_access_token(data=user_token_claims(user)),
+        user=UserResponse.model_validate(user)
+    )
@@ -3,33 +3,42 @@ Categoria Routes
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_read_db
+from app.core.responses import ListSerializer
 from app.core.security import get_current_user
 from app.api.v1.deps import get_current_tenant
 from app.models.user import User
 from app.models.tenant import Tenant
 from app.models.categoria import Categoria
 from app.schemas.categoria import CategoriaCreate, CategoriaResponse
+from app.services import analytics, rollup
+from app.services.analytics import analytics_cache
 
 router = APIRouter()
 
+categoria_serializer = ListSerializer(CategoriaResponse)
+
 @router.get("", response_model=List[CategoriaResponse])
-def get_categorias(
+async def get_categorias(
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all categorias for current tenant"""
-    categorias = db.query(Categoria).filter(Categoria.tenant_id == current_tenant.id).all()
-    return [CategoriaResponse.model_validate(c) for c in categorias]
+    rows = (await db.execute(
+        select(Categoria.id, Categoria.tenant_id, Categoria.nome, Categoria.tipo, Categoria.created_at)
+        .where(Categoria.tenant_id == current_tenant.id)
+    )).all()
+    return categoria_serializer.response(rows)
 
 @router.post("", response_model=CategoriaResponse)
-def create_categoria(
+async def create_categoria(
     categoria_data: CategoriaCreate,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new categoria"""
     categoria = Categoria(
@@ -38,23 +47,25 @@ def create_categoria(
         tipo=categoria_data.tipo
     )
     db.add(categoria)
-    db.commit()
-    db.refresh(categoria)
+    await db.commit()
+    await db.refresh(categoria)
     
     return CategoriaResponse.model_validate(categoria)
 
 @router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_categoria(
+async def delete_categoria(
     categoria_id: str,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a categoria"""
-    categoria = db.query(Categoria).filter(
-        Categoria.id == categoria_id,
-        Categoria.tenant_id == current_tenant.id
-    ).first()
+    categoria = (await db.execute(
+        select(Categoria).where(
+            Categoria.id == categoria_id,
+            Categoria.tenant_id == current_tenant.id
+        )
+    )).scalar_one_or_none()
     
     if not categoria:
         raise HTTPException(
@@ -62,5 +73,10 @@ def delete_categoria(
             detail="Categoria not found"
         )
     
-    db.delete(categoria)
-    db.commit()
+    # The ON DELETE SET NULL foreign key uncategorizes the gastos
+    await db.run_sync(analytics.bump_version, current_tenant.id)
+    await db.run_sync(rollup.move_categoria_to_null, current_tenant.id, categoria.id)
+    
+    await db.delete(categoria)
+    await db.commit()
+    analytics_cache.invalidate(current_tenant.id)
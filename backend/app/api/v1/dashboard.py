@@ -1,22 +1,74 @@
 """
 Dashboard Routes
 """
-from typing import List
+import asyncio
+from typing import List, Optional
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, case, func, select
+from app.core.database import get_read_db, SessionLocal
 from app.core.security import get_current_user
 from app.api.v1.deps import get_current_tenant
 from app.models.user import User
 from app.models.tenant import Tenant
-from app.models.gasto import Gasto
 from app.models.categoria import Categoria
+from app.models.gasto import Gasto
+from app.models.grupo import Grupo
+from app.models.resumo import ResumoMensal
+from app.services import analytics
+from app.services.analytics import analytics_cache
+from app.services.rollup import month_key
 from pydantic import BaseModel
 
 router = APIRouter()
 
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
+         'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+def add_months(day: date, months: int) -> date:
+    """First day of the calendar month `months` away from `day`"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def sum_where(*conditions):
+    """SUM(CASE WHEN ... THEN total ELSE 0 END), portable across SQLite and Postgres"""
+    return func.sum(case((and_(*conditions), ResumoMensal.total), else_=0))
+
+# Dimensions whose values are ids, with the model holding their names
+NAMED_DIMENSIONS = {"categoria": Categoria, "grupo": Grupo, "user": User}
+
+MAX_TIMESERIES_BUCKETS = 5000
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the day/week/month/year bucket containing `day` (weeks start on Monday)"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return date(day.year, day.month, 1)
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    return day
+
+def bucket_index(day: date, first: date, granularity: str) -> int:
+    """Position of `day` in a series whose first bucket starts at `first`"""
+    if granularity == "week":
+        return (day - first).days // 7
+    if granularity == "month":
+        return (day.year - first.year) * 12 + day.month - first.month
+    if granularity == "year":
+        return day.year - first.year
+    return (day - first).days
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return add_months(start, 1)
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    return start + timedelta(days=1)
+
 class DashboardStats(BaseModel):
     total_gastos: float
     gastos_pessoais: float
@@ -25,81 +77,210 @@ class DashboardStats(BaseModel):
     gastos_por_categoria: List[dict]
     gastos_por_mes: List[dict]
 
+class DashboardQuery(BaseModel):
+    group_by: List[str]
+    linhas: List[dict]
+
+class TimeSeries(BaseModel):
+    granularity: str
+    group_by: Optional[str]
+    buckets: List[date]
+    series: List[dict]
+
 @router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(
+async def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get dashboard statistics for current tenant"""
-    
-    # Total gastos
-    total = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.tenant_id == current_tenant.id
-    ).scalar() or 0
-    
-    # Gastos pessoais (grupo_id is null)
-    pessoais = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.tenant_id == current_tenant.id,
-        Gasto.grupo_id == None
-    ).scalar() or 0
-    
-    # Gastos em grupo
-    grupo = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.tenant_id == current_tenant.id,
-        Gasto.grupo_id != None
-    ).scalar() or 0
-    
-    # Gastos mês atual
     hoje = date.today()
     primeiro_dia_mes = date(hoje.year, hoje.month, 1)
-    mes_atual = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.tenant_id == current_tenant.id,
-        Gasto.data >= primeiro_dia_mes
-    ).scalar() or 0
+    
+    # Gastos por mês (últimos 6 meses), one calendar month per bucket
+    meses = [add_months(primeiro_dia_mes, -i) for i in range(5, -1, -1)]
+    buckets = [sum_where(ResumoMensal.ano_mes == month_key(inicio)) for inicio in meses]
+    
+    # Totals and monthly buckets in a single pass over the tenant's rollup
+    totals = (await db.execute(
+        select(
+            func.sum(ResumoMensal.total),
+            sum_where(ResumoMensal.grupo_id == None),
+            sum_where(ResumoMensal.grupo_id != None),
+            sum_where(ResumoMensal.ano_mes >= month_key(primeiro_dia_mes)),
+            *buckets
+        ).where(
+            ResumoMensal.tenant_id == current_tenant.id
+        )
+    )).one()
+    total, pessoais, grupo, mes_atual = totals[:4]
     
     # Gastos por categoria
-    gastos_cat = db.query(
-        Categoria.nome,
-        func.sum(Gasto.valor).label('total')
-    ).join(Gasto, Categoria.id == Gasto.categoria_id).filter(
-        Gasto.tenant_id == current_tenant.id
-    ).group_by(Categoria.nome).all()
+    gastos_cat = (await db.execute(
+        select(
+            Categoria.nome,
+            func.sum(ResumoMensal.total).label('total')
+        ).join(ResumoMensal, Categoria.id == ResumoMensal.categoria_id).where(
+            ResumoMensal.tenant_id == current_tenant.id
+        ).group_by(Categoria.nome)
+    )).all()
     
     gastos_por_categoria = [
         {"categoria": cat, "valor": float(total)}
         for cat, total in gastos_cat
     ]
     
-    # Gastos por mês (últimos 6 meses)
-    gastos_por_mes = []
-    for i in range(5, -1, -1):
-        data_ref = hoje - timedelta(days=30 * i)
-        primeiro_dia = date(data_ref.year, data_ref.month, 1)
-        if data_ref.month == 12:
-            ultimo_dia = date(data_ref.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            ultimo_dia = date(data_ref.year, data_ref.month + 1, 1) - timedelta(days=1)
-        
-        total_mes = db.query(func.sum(Gasto.valor)).filter(
-            Gasto.tenant_id == current_tenant.id,
-            Gasto.data >= primeiro_dia,
-            Gasto.data <= ultimo_dia
-        ).scalar() or 0
-        
-        meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
-                 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-        
-        gastos_por_mes.append({
-            "mes": meses[data_ref.month - 1],
-            "valor": float(total_mes)
-        })
+    gastos_por_mes = [
+        {"mes": MESES[inicio.month - 1], "valor": float(total_mes or 0)}
+        for inicio, total_mes in zip(meses, totals[4:])
+    ]
     
     return DashboardStats(
-        total_gastos=float(total),
-        gastos_pessoais=float(pessoais),
-        gastos_grupo=float(grupo),
-        total_mes_atual=float(mes_atual),
+        total_gastos=float(total or 0),
+        gastos_pessoais=float(pessoais or 0),
+        gastos_grupo=float(grupo or 0),
+        total_mes_atual=float(mes_atual or 0),
         gastos_por_categoria=gastos_por_categoria,
         gastos_por_mes=gastos_por_mes
     )
+
+@router.get("/query", response_model=DashboardQuery)
+async def query_dashboard(
+    group_by: str = Query("", description="Comma-separated: categoria, grupo, user, dia, semana, mes, ano"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    categoria_id: Optional[str] = None,
+    grupo_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    valor_min: Optional[float] = None,
+    valor_max: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Ad-hoc totals of the tenant's gastos grouped by any combination of
+    dimensions, computed from the in-memory columnar cache.
+    """
+    dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+    invalid = [name for name in dimensions if name not in analytics.DIMENSIONS]
+    if invalid or len(set(dimensions)) != len(dimensions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid group_by; use a comma-separated subset of: {', '.join(analytics.DIMENSIONS)}"
+        )
+    
+    # Reload the tenant when its gastos changed since the columns were built
+    version = (await db.execute(analytics.version_select(current_tenant.id))).scalar_one()
+    columns = analytics_cache.get(current_tenant.id, version)
+    if columns is None:
+        columns = await asyncio.to_thread(analytics.load_tenant, SessionLocal, current_tenant.id)
+        analytics_cache.put(current_tenant.id, columns)
+    
+    linhas = columns.aggregate(
+        dimensions,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        valor_min=valor_min,
+        valor_max=valor_max,
+        categoria=categoria_id,
+        grupo=grupo_id,
+        user=user_id
+    )
+    
+    # Resolve names for the id dimensions, one query per dimension
+    for dimension in dimensions:
+        model = NAMED_DIMENSIONS.get(dimension)
+        if model is None:
+            continue
+        ids = {linha[dimension] for linha in linhas if linha[dimension] is not None}
+        nomes = dict((await db.execute(select(model.id, model.nome).where(model.id.in_(ids)))).all()) if ids else {}
+        for linha in linhas:
+            linha[f"{dimension}_id"] = linha.pop(dimension)
+            linha[f"{dimension}_nome"] = nomes.get(linha[f"{dimension}_id"])
+    
+    return DashboardQuery(group_by=dimensions, linhas=linhas)
+
+@router.get("/timeseries", response_model=TimeSeries)
+async def get_timeseries(
+    inicio: Optional[date] = Query(None, alias="from"),
+    fim: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("month", pattern="^(day|week|month|year)$"),
+    group_by: Optional[str] = Query(None, pattern="^(categoria|grupo)$"),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Zero-filled totals per day, week, month or year between `from` and `to`
+    (default: the last six calendar months), optionally one series per
+    categoria or grupo. `buckets` holds the first day of each bucket and every
+    series has one value per bucket.
+    """
+    fim = fim or date.today()
+    inicio = inicio or add_months(fim, -5)
+    if inicio > fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'"
+        )
+    first = bucket_start(inicio, granularity)
+    size = bucket_index(fim, first, granularity) + 1
+    if size > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many buckets ({size}); use a coarser granularity or a shorter range"
+        )
+    
+    # Whole months can be read from the monthly rollup instead of the raw gastos
+    whole_months = (
+        granularity in ("month", "year")
+        and inicio.day == 1
+        and next_bucket(fim, "day").day == 1
+    )
+    if whole_months:
+        key, valor = ResumoMensal.ano_mes, ResumoMensal.total
+        source = ResumoMensal
+        in_range = ResumoMensal.ano_mes.between(month_key(inicio), month_key(fim))
+    else:
+        key, valor = Gasto.data, Gasto.valor
+        source = Gasto
+        in_range = Gasto.data.between(inicio, fim)
+    
+    # One grouped query: per day (or month) and dimension value
+    columns = [key]
+    if group_by:
+        model = NAMED_DIMENSIONS[group_by]
+        dimension = getattr(source, f"{group_by}_id")
+        columns += [dimension, model.nome]
+    query = select(*columns, func.sum(valor)).select_from(source)
+    if group_by:
+        query = query.outerjoin(model, model.id == dimension)
+    rows = (await db.execute(
+        query.where(source.tenant_id == current_tenant.id, in_range).group_by(*columns)
+    )).all()
+    
+    # Fold the rows into their buckets in a single pass
+    series = {}
+    for row in rows:
+        day = date(int(row[0][:4]), int(row[0][5:7]), 1) if whole_months else row[0]
+        serie_id, nome = (row[1], row[2]) if group_by else (None, "Total")
+        serie = series.get(serie_id)
+        if serie is None:
+            serie = series[serie_id] = {"id": serie_id, "nome": nome, "valores": [0.0] * size}
+        serie["valores"][bucket_index(day, first, granularity)] += float(row[-1] or 0)
+    if not group_by and not series:
+        series[None] = {"id": None, "nome": "Total", "valores": [0.0] * size}
+    for serie in series.values():
+        serie["valores"] = [round(total, 2) for total in serie["valores"]]
+    
+    buckets = [first]
+    while len(buckets) < size:
+        buckets.append(next_bucket(buckets[-1], granularity))
+    
+    return TimeSeries(
+        granularity=granularity,
+        group_by=group_by,
+        buckets=buckets,
+        series=sorted(series.values(), key=lambda serie: (serie["nome"] is None, serie["nome"] or ""))
+    )
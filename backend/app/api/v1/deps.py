@@ -1,22 +1,42 @@
 """
 API Dependencies
 """
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
-from app.models.tenant import Tenant, TenantUser
+from app.models.tenant import RoleEnum, Tenant, TenantUser
 
-async def get_current_tenant(
+# (user_id, tenant_id) -> (detached Tenant, RoleEnum); only confirmed memberships are cached
+membership_cache = TTLCache(
+    maxsize=settings.MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.MEMBERSHIP_CACHE_TTL_SECONDS
+)
+
+def invalidate_membership(user_id: Optional[str] = None, tenant_id: Optional[str] = None) -> None:
+    """
+    Drop cached memberships of a user, of a tenant, or both.
+    Call whenever a membership is created, changes role or is removed.
+    """
+    membership_cache.discard_where(
+        lambda key, value: (user_id is None or key[0] == user_id)
+        and (tenant_id is None or key[1] == tenant_id)
+    )
+
+async def get_current_membership(
     x_tenant_id: Optional[str] = Header(None, alias="X-Tenant-ID"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> Tenant:
+    db: AsyncSession = Depends(get_db)
+) -> Tuple[Tenant, RoleEnum]:
     """
-    Get the current tenant from header and verify user access.
-    Every request that needs tenant context must use this dependency.
+    Get the current tenant from header and the user's role in it.
+    Confirmed memberships are cached per worker for MEMBERSHIP_CACHE_TTL_SECONDS;
+    the returned Tenant is detached from the session.
     """
     if not x_tenant_id:
         raise HTTPException(
@@ -24,24 +44,51 @@ async def get_current_tenant(
             detail="X-Tenant-ID header is required"
         )
     
+    cache_key = (current_user.id, x_tenant_id)
+    cached = membership_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Load the tenant and the user's membership in one query
+    row = (await db.execute(
+        select(Tenant, TenantUser.role).outerjoin(
+            TenantUser,
+            and_(TenantUser.tenant_id == Tenant.id, TenantUser.user_id == current_user.id)
+        ).where(Tenant.id == x_tenant_id)
+    )).first()
+    
     # Verify tenant exists
-    tenant = db.query(Tenant).filter(Tenant.id == x_tenant_id).first()
-    if not tenant:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tenant not found"
         )
     
     # Verify user has access to this tenant
-    tenant_user = db.query(TenantUser).filter(
-        TenantUser.tenant_id == x_tenant_id,
-        TenantUser.user_id == current_user.id
-    ).first()
-    
-    if not tenant_user:
+    tenant, role = row
+    if role is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User does not have access to this tenant"
         )
     
+    db.expunge(tenant)
+    membership_cache.set(cache_key, (tenant, role))
+    return tenant, role
+
+async def get_current_tenant(membership: Tuple[Tenant, RoleEnum] = Depends(get_current_membership)) -> Tenant:
+    """
+    Get the current tenant from header and verify user access.
+    Every request that needs tenant context must use this dependency.
+    """
+    return membership[0]
+
+async def get_admin_tenant(membership: Tuple[Tenant, RoleEnum] = Depends(get_current_membership)) -> Tenant:
+    """The current tenant, for its owners and admins only"""
+    tenant, role = membership
+    if role not in (RoleEnum.owner, RoleEnum.admin):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only tenant owners and admins can do this"
+        )
     return tenant
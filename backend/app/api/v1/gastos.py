@@ -1,67 +1,213 @@
 """
 Gasto Routes
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_read_db, AsyncReadSessionLocal, SessionLocal
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.responses import ListSerializer
 from app.core.security import get_current_user
 from app.api.v1.deps import get_current_tenant
 from app.models.user import User
 from app.models.tenant import Tenant
 from app.models.gasto import Gasto
-from app.models.categoria import Categoria
-from app.models.grupo import Grupo
-from app.schemas.gasto import GastoCreate, GastoUpdate, GastoResponse
+from app.schemas.gasto import (
+    GastoCreate, GastoUpdate, GastoResponse, GastoImportResult, GastoBatchRequest, GastoBatchResult
+)
+from app.services import analytics, importer, rollup, search
+from app.services.gastos import EXPORT_BATCH_SIZE, filter_gastos, gasto_response_select
+from app.services.analytics import analytics_cache
+from app.services.exporter import EXPORT_FORMATS
 
 router = APIRouter()
 
-def enrich_gasto_response(gasto: Gasto, db: Session) -> GastoResponse:
-    """Add related names to gasto response"""
-    categoria = db.query(Categoria).filter(Categoria.id == gasto.categoria_id).first() if gasto.categoria_id else None
-    grupo = db.query(Grupo).filter(Grupo.id == gasto.grupo_id).first() if gasto.grupo_id else None
-    user = db.query(User).filter(User.id == gasto.user_id).first()
-    
-    return GastoResponse(
-        id=gasto.id,
-        tenant_id=gasto.tenant_id,
-        user_id=gasto.user_id,
-        grupo_id=gasto.grupo_id,
-        categoria_id=gasto.categoria_id,
-        valor=gasto.valor,
-        data=gasto.data,
-        descricao=gasto.descricao,
-        created_at=gasto.created_at,
-        categoria_nome=categoria.nome if categoria else None,
-        grupo_nome=grupo.nome if grupo else None,
-        user_nome=user.nome if user else None
-    )
+gasto_serializer = ListSerializer(GastoResponse)
+
+STREAM_BATCH_SIZE = 500
+
+# All fields an update may set
+UPDATABLE_FIELDS = rollup.BUCKET_FIELDS + ("descricao",)
+
+@asynccontextmanager
+async def gasto_writes(db: AsyncSession):
+    """Turn foreign key violations (unknown grupo or categoria) into a 400"""
+    try:
+        yield
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Grupo or categoria not found"
+        )
+
+def gasto_response_from_row(row) -> GastoResponse:
+    """Build the response from a gasto_response_select row"""
+    return GastoResponse(**row._mapping)
+
+async def get_gasto_response(gasto_id: str, db: AsyncSession) -> GastoResponse:
+    """Load a single gasto with its related names"""
+    row = (await db.execute(gasto_response_select().where(Gasto.id == gasto_id))).one()
+    return gasto_response_from_row(row)
+
+async def stream_gastos(tenant_id: str, **filters) -> AsyncIterator[bytes]:
+    """
+    Write gastos out as a JSON array while they are read from the DB.
+    Uses its own session because the request session is closed before
+    the response body is sent.
+    """
+    async with AsyncReadSessionLocal() as db:
+        query = filter_gastos(gasto_response_select(), tenant_id, **filters)
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        yield b"["
+        separator = b""
+        async for row in result:
+            yield separator + gasto_serializer.dump_item(row._mapping)
+            separator = b","
+        yield b"]"
 
 @router.get("", response_model=List[GastoResponse])
-def get_gastos(
+async def get_gastos(
     grupo_id: Optional[str] = Query(None),
     categoria_id: Optional[str] = Query(None),
+    data_inicio: Optional[date] = Query(None),
+    data_fim: Optional[date] = Query(None),
+    valor_min: Optional[float] = Query(None),
+    valor_max: Optional[float] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all gastos for current tenant with optional filters"""
-    query = db.query(Gasto).filter(Gasto.tenant_id == current_tenant.id)
+    """
+    Get gastos for current tenant with optional filters.
+    With `limit`, returns one page and sets `X-Next-Cursor` when more rows exist;
+    without it, the whole result is streamed as it is read.
+    """
+    filters = dict(
+        grupo_id=grupo_id,
+        categoria_id=categoria_id,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        valor_min=valor_min,
+        valor_max=valor_max,
+        cursor=decode_cursor(cursor, date.fromisoformat, str) if cursor else None
+    )
     
-    if grupo_id:
-        query = query.filter(Gasto.grupo_id == grupo_id)
-    if categoria_id:
-        query = query.filter(Gasto.categoria_id == categoria_id)
+    if limit is None:
+        return StreamingResponse(
+            stream_gastos(current_tenant.id, **filters),
+            media_type="application/json"
+        )
+    
+    query = filter_gastos(gasto_response_select(), current_tenant.id, **filters)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].data, rows[-1].id)
     
-    gastos = query.order_by(Gasto.data.desc()).all()
-    return [enrich_gasto_response(g, db) for g in gastos]
+    return gasto_serializer.response(rows, headers=headers)
+
+async def export_chunks(formato: str, tenant_id: str, **filters) -> AsyncIterator[str]:
+    """Encode the tenant's gastos batch by batch from a server-side cursor"""
+    encode = EXPORT_FORMATS[formato].encode
+    async with AsyncReadSessionLocal() as db:
+        query = filter_gastos(gasto_response_select(), tenant_id, **filters)
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        first = True
+        async for rows in result.partitions():
+            yield encode(rows, first)
+            first = False
+        if first and formato == "csv":
+            yield encode([], True)
+
+@router.get("/export")
+async def export_gastos(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson|columnar)$"),
+    grupo_id: Optional[str] = Query(None),
+    categoria_id: Optional[str] = Query(None),
+    data_inicio: Optional[date] = Query(None),
+    data_fim: Optional[date] = Query(None),
+    valor_min: Optional[float] = Query(None),
+    valor_max: Optional[float] = Query(None),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    Export gastos with category, group and user names as csv, ndjson or
+    columnar (one JSON record batch per line), streamed as it is read.
+    """
+    export_format = EXPORT_FORMATS[formato]
+    chunks = export_chunks(
+        formato,
+        current_tenant.id,
+        grupo_id=grupo_id,
+        categoria_id=categoria_id,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        valor_min=valor_min,
+        valor_max=valor_max
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="gastos.{export_format.extension}"'}
+    )
+
+@router.get("/search", response_model=List[GastoResponse])
+async def search_gastos(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search gastos by description, best matches first.
+    Accents and case are ignored and each word matches as a prefix
+    ("farm" finds "Farmácia"). Pages with `X-Next-Cursor` like the listing.
+    """
+    terms = search.parse_terms(q)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no words"
+        )
+    
+    query, rank = search.apply_search(gasto_response_select(), db.bind.dialect.name, terms)
+    ranked = query.add_columns(rank.label("rank")).where(Gasto.tenant_id == current_tenant.id).subquery()
+    page = select(ranked)
+    if cursor:
+        cursor_rank, cursor_id = decode_cursor(cursor, float, str)
+        page = page.where(or_(
+            ranked.c.rank > cursor_rank,
+            and_(ranked.c.rank == cursor_rank, ranked.c.id > cursor_id)
+        ))
+    
+    rows = (await db.execute(page.order_by(ranked.c.rank, ranked.c.id).limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].rank, rows[-1].id)
+    
+    return gasto_serializer.response(rows, headers=headers)
 
 @router.post("", response_model=GastoResponse)
-def create_gasto(
+async def create_gasto(
     gasto_data: GastoCreate,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new gasto"""
     gasto = Gasto(
@@ -73,25 +219,161 @@ def create_gasto(
         data=gasto_data.data,
         descricao=gasto_data.descricao
     )
-    db.add(gasto)
-    db.commit()
-    db.refresh(gasto)
+    async with gasto_writes(db):
+        version = await db.run_sync(analytics.bump_version, current_tenant.id)
+        db.add(gasto)
+        await db.run_sync(rollup.add_gasto, gasto)
+        await db.commit()
+    analytics_cache.append(current_tenant.id, version, [
+        (gasto.data, gasto.valor, gasto.categoria_id, gasto.grupo_id, gasto.user_id)
+    ])
     
-    return enrich_gasto_response(gasto, db)
+    return await get_gasto_response(gasto.id, db)
+
+@router.post("/import", response_model=GastoImportResult)
+async def import_gastos(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, pattern="^(csv|ofx)$"),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant)
+):
+    """
+    Import a bank statement (CSV or OFX) as gastos.
+    Categoria and grupo are given by name; rows that cannot be imported are
+    reported individually and do not stop the import.
+    """
+    if formato is None:
+        formato = "ofx" if (arquivo.filename or "").lower().endswith(".ofx") else "csv"
+    
+    # Parsing and batched inserts run on the sync engine, off the event loop
+    result = await asyncio.to_thread(
+        importer.import_file,
+        SessionLocal,
+        arquivo.file,
+        formato,
+        current_tenant.id,
+        current_user.id
+    )
+    analytics_cache.invalidate(current_tenant.id)
+    return GastoImportResult(
+        importados=result.importados,
+        rejeitados=result.rejeitados,
+        erros=result.erros
+    )
+
+@router.post("/batch", response_model=List[GastoBatchResult])
+async def batch_gastos(
+    batch: GastoBatchRequest,
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply many creates, updates and deletes in a single transaction.
+    All referenced ids are checked against the tenant in one query and nothing
+    is applied if any of them is missing. Results follow the operation order.
+    """
+    referenced = {op.id for op in batch.operacoes if op.op != "create"}
+    rows = []
+    if referenced:
+        rows = (await db.execute(
+            select(Gasto.id, Gasto.grupo_id, Gasto.categoria_id, Gasto.valor, Gasto.data, Gasto.descricao).where(
+                Gasto.tenant_id == current_tenant.id,
+                Gasto.id.in_(referenced)
+            )
+        )).all()
+    original = {row.id: dict(row._mapping) for row in rows}
+    
+    missing = referenced - original.keys()
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Gasto not found: {', '.join(sorted(missing))}"
+        )
+    
+    # Replay the operations in order on in-memory state
+    current = {gasto_id: dict(state) for gasto_id, state in original.items()}
+    created = {}
+    changes = {}
+    deleted = set()
+    results = []
+    for op in batch.operacoes:
+        if op.op == "create":
+            gasto_id = str(uuid.uuid4())
+            created[gasto_id] = {
+                "id": gasto_id,
+                "tenant_id": current_tenant.id,
+                "user_id": current_user.id,
+                **{field: getattr(op, field) for field in UPDATABLE_FIELDS}
+            }
+            results.append((op.op, gasto_id))
+            continue
+        
+        if op.id in deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Gasto not found: {op.id}"
+            )
+        if op.op == "delete":
+            deleted.add(op.id)
+            changes.pop(op.id, None)
+        else:
+            fields = {field: getattr(op, field) for field in UPDATABLE_FIELDS if getattr(op, field) is not None}
+            current[op.id].update(fields)
+            changes.setdefault(op.id, {}).update(fields)
+        results.append((op.op, op.id))
+    
+    # Rollup: take touched gastos out of their old bucket and into the final one
+    deltas = []
+    for gasto_id, before in original.items():
+        after = None if gasto_id in deleted else current[gasto_id]
+        if after is not None and all(after[f] == before[f] for f in rollup.BUCKET_FIELDS):
+            continue
+        deltas.append((before["data"], before["categoria_id"], before["grupo_id"], -before["valor"], -1))
+        if after is not None:
+            deltas.append((after["data"], after["categoria_id"], after["grupo_id"], after["valor"], 1))
+    for state in created.values():
+        deltas.append((state["data"], state["categoria_id"], state["grupo_id"], state["valor"], 1))
+    
+    async with gasto_writes(db):
+        await db.run_sync(analytics.bump_version, current_tenant.id)
+        if created:
+            await db.execute(insert(Gasto), list(created.values()))
+        if changes:
+            await db.execute(update(Gasto), [{"id": gasto_id, **fields} for gasto_id, fields in changes.items()])
+        if deleted:
+            await db.execute(delete(Gasto).where(Gasto.id.in_(deleted)))
+        await db.run_sync(rollup.add_many, current_tenant.id, deltas)
+        await db.commit()
+    analytics_cache.invalidate(current_tenant.id)
+    
+    # Enrich every surviving gasto with one joined query
+    surviving = (created.keys() | changes.keys()) - deleted
+    responses = {}
+    if surviving:
+        rows = (await db.execute(gasto_response_select().where(Gasto.id.in_(surviving)))).all()
+        responses = {row.id: gasto_response_from_row(row) for row in rows}
+    
+    return [
+        GastoBatchResult(op=op, id=gasto_id, gasto=responses.get(gasto_id))
+        for op, gasto_id in results
+    ]
 
 @router.put("/{gasto_id}", response_model=GastoResponse)
-def update_gasto(
+async def update_gasto(
     gasto_id: str,
     gasto_data: GastoUpdate,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a gasto"""
-    gasto = db.query(Gasto).filter(
-        Gasto.id == gasto_id,
-        Gasto.tenant_id == current_tenant.id
-    ).first()
+    gasto = (await db.execute(
+        select(Gasto).where(
+            Gasto.id == gasto_id,
+            Gasto.tenant_id == current_tenant.id
+        )
+    )).scalar_one_or_none()
     
     if not gasto:
         raise HTTPException(
@@ -99,6 +381,12 @@ def update_gasto(
             detail="Gasto not found"
         )
     
+    # Move the gasto out of its rollup bucket when a bucketed field changes
+    affects_rollup = any(getattr(gasto_data, field) is not None for field in rollup.BUCKET_FIELDS)
+    if affects_rollup:
+        await db.run_sync(analytics.bump_version, current_tenant.id)
+        await db.run_sync(rollup.remove_gasto, gasto)
+    
     # Update fields if provided
     if gasto_data.grupo_id is not None:
         gasto.grupo_id = gasto_data.grupo_id
@@ -111,23 +399,29 @@ def update_gasto(
     if gasto_data.descricao is not None:
         gasto.descricao = gasto_data.descricao
     
-    db.commit()
-    db.refresh(gasto)
+    async with gasto_writes(db):
+        if affects_rollup:
+            await db.run_sync(rollup.add_gasto, gasto)
+        await db.commit()
+    if affects_rollup:
+        analytics_cache.invalidate(current_tenant.id)
     
-    return enrich_gasto_response(gasto, db)
+    return await get_gasto_response(gasto.id, db)
 
 @router.delete("/{gasto_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_gasto(
+async def delete_gasto(
     gasto_id: str,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a gasto"""
-    gasto = db.query(Gasto).filter(
-        Gasto.id == gasto_id,
-        Gasto.tenant_id == current_tenant.id
-    ).first()
+    gasto = (await db.execute(
+        select(Gasto).where(
+            Gasto.id == gasto_id,
+            Gasto.tenant_id == current_tenant.id
+        )
+    )).scalar_one_or_none()
     
     if not gasto:
         raise HTTPException(
@@ -135,5 +429,8 @@ def delete_gasto(
             detail="Gasto not found"
         )
     
-    db.delete(gasto)
-    db.commit()
+    await db.run_sync(analytics.bump_version, current_tenant.id)
+    await db.run_sync(rollup.remove_gasto, gasto)
+    await db.delete(gasto)
+    await db.commit()
+    analytics_cache.invalidate(current_tenant.id)
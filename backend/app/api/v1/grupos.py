@@ -3,33 +3,45 @@ Grupo Routes
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.responses import ListSerializer
 from app.core.security import get_current_user
 from app.api.v1.deps import get_current_tenant
 from app.models.user import User
 from app.models.tenant import Tenant
 from app.models.grupo import Grupo
+from app.schemas.job import JobResponse
 from app.schemas.grupo import GrupoCreate, GrupoResponse
+from app.services import jobs, purge
+from app.services.analytics import analytics_cache
 
 router = APIRouter()
 
+grupo_serializer = ListSerializer(GrupoResponse)
+
 @router.get("", response_model=List[GrupoResponse])
-def get_grupos(
+async def get_grupos(
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all grupos for current tenant"""
-    grupos = db.query(Grupo).filter(Grupo.tenant_id == current_tenant.id).all()
-    return [GrupoResponse.model_validate(g) for g in grupos]
+    rows = (await db.execute(
+        select(Grupo.id, Grupo.tenant_id, Grupo.nome, Grupo.tipo, Grupo.created_at)
+        .where(Grupo.tenant_id == current_tenant.id)
+    )).all()
+    return grupo_serializer.response(rows)
 
 @router.post("", response_model=GrupoResponse)
-def create_grupo(
+async def create_grupo(
     grupo_data: GrupoCreate,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new grupo"""
     grupo = Grupo(
@@ -38,23 +50,28 @@ def create_grupo(
         tipo=grupo_data.tipo
     )
     db.add(grupo)
-    db.commit()
-    db.refresh(grupo)
+    await db.commit()
+    await db.refresh(grupo)
     
     return GrupoResponse.model_validate(grupo)
 
 @router.delete("/{grupo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_grupo(
+async def delete_grupo(
     grupo_id: str,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Delete a grupo"""
-    grupo = db.query(Grupo).filter(
-        Grupo.id == grupo_id,
-        Grupo.tenant_id == current_tenant.id
-    ).first()
+    """
+    Delete a grupo and its gastos. Grupos with more than PURGE_CHUNK_SIZE
+    gastos are purged in chunks by a background job (202 Accepted, with the job).
+    """
+    grupo = (await db.execute(
+        select(Grupo.id).where(
+            Grupo.id == grupo_id,
+            Grupo.tenant_id == current_tenant.id
+        )
+    )).scalar_one_or_none()
     
     if not grupo:
         raise HTTPException(
@@ -62,5 +79,10 @@ def delete_grupo(
             detail="Grupo not found"
         )
     
-    db.delete(grupo)
-    db.commit()
+    if await db.run_sync(purge.count_gastos, current_tenant.id, grupo_id) > settings.PURGE_CHUNK_SIZE:
+        job = await jobs.queue(db, "purge_grupo", current_tenant.id, current_user.id, {"grupo_id": grupo_id})
+        return JSONResponse(JobResponse.model_validate(job).model_dump(mode="json"), status_code=status.HTTP_202_ACCEPTED)
+    
+    await db.run_sync(purge.delete_grupo, current_tenant.id, grupo_id)
+    await db.commit()
+    analytics_cache.invalidate(current_tenant.id)
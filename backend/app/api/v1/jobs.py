@@ -0,0 +1,110 @@
+"""
+Job Routes
+
+Queue heavy work for the background job runner (app.services.jobs) and
+follow it. Tenant and grupo deletions queue their purge jobs themselves.
+"""
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, get_read_db
+from app.core.security import get_current_user
+from app.api.v1.deps import get_admin_tenant, get_current_tenant
+from app.models.job import Job, JobStatusEnum
+from app.models.tenant import Tenant, TenantUser
+from app.models.user import User
+from app.schemas.job import ExportJobCreate, JobResponse
+from app.services import jobs
+from app.services.exporter import EXPORT_FORMATS
+
+router = APIRouter()
+
+@router.post("/export", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    export: ExportJobCreate,
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_db)
+):
+    """Export gastos to a file in the background; download it from /jobs/{id}/download"""
+    job = await jobs.queue(db, "export", current_tenant.id, current_user.id, export.model_dump(mode="json", exclude_none=True))
+    return JobResponse.model_validate(job)
+
+@router.post("/rollup-rebuild", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_rollup_rebuild_job(
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_admin_tenant),
+    db: AsyncSession = Depends(get_db)
+):
+    """Recompute the tenant's monthly rollup from its gastos in the background (owners and admins)"""
+    return JobResponse.model_validate(await jobs.queue(db, "rollup_rebuild", current_tenant.id, current_user.id))
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Latest jobs of the current tenant"""
+    rows = (await db.execute(
+        select(Job).where(Job.tenant_id == current_tenant.id).order_by(Job.created_at.desc()).limit(limit)
+    )).scalars().all()
+    return [JobResponse.model_validate(job) for job in rows]
+
+async def get_visible_job(job_id: str, current_user: User, db: AsyncSession) -> Job:
+    """A job the user queued or that belongs to one of their tenants"""
+    job = (await db.execute(
+        select(Job).where(
+            Job.id == job_id,
+            or_(
+                Job.user_id == current_user.id,
+                Job.tenant_id.in_(select(TenantUser.tenant_id).where(TenantUser.user_id == current_user.id))
+            )
+        )
+    )).scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Status and result of a job. Also works for the purge of a deleted tenant,
+    for the user who deleted it.
+    """
+    return JobResponse.model_validate(await get_visible_job(job_id, current_user, db))
+
+@router.get("/{job_id}/download")
+async def download_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """File written by a finished export job"""
+    job = await get_visible_job(job_id, current_user, db)
+    if job.tipo != "export" or job.status != JobStatusEnum.done:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job has no file to download yet"
+        )
+    
+    formato = job.result["format"]
+    path = jobs.export_path(job.id, formato)
+    if not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Export file no longer available"
+        )
+    export_format = EXPORT_FORMATS[formato]
+    return FileResponse(path, media_type=export_format.media_type, filename=f"gastos.{export_format.extension}")
@@ -0,0 +1,48 @@
+"""
+Profile Routes
+
+Download the request profiles recorded by app.core.profiling. Every route
+requires the profiling token in the X-Profile-Token header.
+"""
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from app.core.profiling import PROFILE_HEADER, is_profiling_token, list_profiles, profile_path
+
+def require_profiling_token(token: Optional[str] = Header(None, alias=PROFILE_HEADER)) -> None:
+    """Only holders of PROFILING_TOKEN may read profiles"""
+    if not is_profiling_token(token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid profiling token"
+        )
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+def load_profile(profile_id: str) -> dict:
+    path = profile_path(profile_id)
+    if path is None or not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return json.loads(path.read_text())
+
+@router.get("")
+def get_profiles():
+    """Stored profiles, newest first"""
+    return list_profiles()
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str):
+    """Full profile: timings, SQL statements with their plans, and collapsed stacks"""
+    return load_profile(profile_id)
+
+@router.get("/{profile_id}/collapsed")
+def get_profile_stacks(profile_id: str):
+    """Collapsed stacks only, for flamegraph.pl or speedscope"""
+    return Response(
+        load_profile(profile_id)["collapsed"],
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed"'}
+    )
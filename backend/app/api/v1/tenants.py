@@ -1,33 +1,45 @@
 """
 Tenant Routes
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from app.core.database import get_db
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.responses import ListSerializer
 from app.core.security import get_current_user
+from app.api.v1.deps import invalidate_membership
 from app.models.user import User
 from app.models.tenant import Tenant, TenantUser, RoleEnum
+from app.schemas.job import JobResponse
 from app.schemas.tenant import TenantCreate, TenantResponse, TenantUserResponse, JoinTenantRequest
+from app.services import jobs, purge
+from app.services.analytics import analytics_cache
 
 router = APIRouter()
+tenant_serializer = ListSerializer(TenantResponse)
+tenant_user_serializer = ListSerializer(TenantUserResponse)
 
 @router.get("", response_model=List[TenantResponse])
-def get_my_tenants(
+async def get_my_tenants(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all tenants the current user belongs to"""
-    tenant_users = db.query(TenantUser).filter(TenantUser.user_id == current_user.id).all()
-    tenant_ids = [tu.tenant_id for tu in tenant_users]
-    tenants = db.query(Tenant).filter(Tenant.id.in_(tenant_ids)).all()
-    return [TenantResponse.model_validate(t) for t in tenants]
+    rows = (await db.execute(
+        select(Tenant.id, Tenant.nome, Tenant.plano, Tenant.created_at)
+        .join(TenantUser, TenantUser.tenant_id == Tenant.id)
+        .where(TenantUser.user_id == current_user.id)
+    )).all()
+    return tenant_serializer.response(rows)
 
 @router.post("", response_model=TenantResponse)
-def create_tenant(
+async def create_tenant(
     tenant_data: TenantCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new tenant and set current user as owner"""
     tenant = Tenant(
@@ -35,8 +47,8 @@ def create_tenant(
         plano=tenant_data.plano
     )
     db.add(tenant)
-    db.commit()
-    db.refresh(tenant)
+    await db.commit()
+    await db.refresh(tenant)
     
     # Add current user as owner
     tenant_user = TenantUser(
@@ -45,18 +57,19 @@ def create_tenant(
         role=RoleEnum.owner
     )
     db.add(tenant_user)
-    db.commit()
+    await db.commit()
+    invalidate_membership(current_user.id, tenant.id)
     
     return TenantResponse.model_validate(tenant)
 
 @router.post("/join", response_model=TenantResponse)
-def join_tenant(
+async def join_tenant(
     request: JoinTenantRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Join an existing tenant as a member"""
-    tenant = db.query(Tenant).filter(Tenant.id == request.tenant_id).first()
+    tenant = await db.get(Tenant, request.tenant_id)
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -64,10 +77,12 @@ def join_tenant(
         )
     
     # Check if already a member
-    existing = db.query(TenantUser).filter(
-        TenantUser.tenant_id == request.tenant_id,
-        TenantUser.user_id == current_user.id
-    ).first()
+    existing = (await db.execute(
+        select(TenantUser).where(
+            TenantUser.tenant_id == request.tenant_id,
+            TenantUser.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if existing:
         raise HTTPException(
@@ -82,41 +97,85 @@ def join_tenant(
         role=RoleEnum.member
     )
     db.add(tenant_user)
-    db.commit()
+    await db.commit()
+    invalidate_membership(current_user.id, tenant.id)
     
     return TenantResponse.model_validate(tenant)
 
 @router.get("/{tenant_id}/users", response_model=List[TenantUserResponse])
-def get_tenant_users(
+async def get_tenant_users(
     tenant_id: str,
+    role: Optional[RoleEnum] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all users in a tenant"""
-    # Verify user has access
-    access = db.query(TenantUser).filter(
-        TenantUser.tenant_id == tenant_id,
-        TenantUser.user_id == current_user.id
-    ).first()
+    """
+    Get the users of a tenant, ordered by user id, optionally only those with `role`.
+    With `limit`, returns one page and sets `X-Next-Cursor` when more members exist.
+    """
+    # One query: the caller's membership, outer-joined to the members it may see.
+    # No row means no access; a single row without a member is an empty page.
+    caller = aliased(TenantUser)
+    member = [TenantUser.tenant_id == caller.tenant_id]
+    if role is not None:
+        member.append(TenantUser.role == role)
+    if cursor:
+        member.append(TenantUser.user_id > decode_cursor(cursor, str)[0])
+    query = (
+        select(
+            TenantUser.id, TenantUser.tenant_id, TenantUser.user_id, TenantUser.role,
+            User.nome.label("user_nome"), User.email.label("user_email")
+        )
+        .select_from(caller)
+        .outerjoin(TenantUser, and_(*member))
+        .outerjoin(User, User.id == TenantUser.user_id)
+        .where(caller.tenant_id == tenant_id, caller.user_id == current_user.id)
+        .order_by(TenantUser.user_id)
+    )
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = (await db.execute(query)).all()
     
-    if not access:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No access to this tenant"
         )
+    rows = [row for row in rows if row.id is not None]
     
-    tenant_users = db.query(TenantUser).filter(TenantUser.tenant_id == tenant_id).all()
+    headers = {}
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].user_id)
+    
+    return tenant_user_serializer.response(rows, headers=headers)
+
+@router.delete("/{tenant_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_tenant(
+    tenant_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete a tenant and all its data (owners only). Access is revoked right
+    away; the data is purged in chunks by the returned background job.
+    """
+    role = (await db.execute(
+        select(TenantUser.role).where(
+            TenantUser.tenant_id == tenant_id,
+            TenantUser.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
-    result = []
-    for tu in tenant_users:
-        user = db.query(User).filter(User.id == tu.user_id).first()
-        result.append(TenantUserResponse(
-            id=tu.id,
-            tenant_id=tu.tenant_id,
-            user_id=tu.user_id,
-            role=tu.role.value,
-            user_nome=user.nome if user else None,
-            user_email=user.email if user else None
-        ))
+    if role != RoleEnum.owner:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only owners can delete a tenant"
+        )
     
-    return result
+    await db.run_sync(purge.revoke_access, tenant_id)
+    invalidate_membership(tenant_id=tenant_id)
+    analytics_cache.invalidate(tenant_id)
+    return JobResponse.model_validate(await jobs.queue(db, "purge_tenant", tenant_id, current_user.id))
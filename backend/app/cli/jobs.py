@@ -0,0 +1,52 @@
+"""
+Background job commands
+
+Usage:
+    python -m app.cli.jobs worker [--threads 2]     # run jobs until interrupted
+    python -m app.cli.jobs list [--status failed]
+    python -m app.cli.jobs prune [--days 7]          # drop finished jobs and their files
+"""
+import argparse
+import logging
+import sys
+from datetime import timedelta
+from sqlalchemy import select
+from app.core.database import SessionLocal
+from app.models.job import Job, JobStatusEnum
+from app.services import jobs
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run and inspect background jobs")
+    parser.add_argument("command", choices=["worker", "list", "prune"])
+    parser.add_argument("--threads", type=int, default=2, help="Jobs run at once (worker)")
+    parser.add_argument("--status", choices=[s.value for s in JobStatusEnum], help="Filter (list)")
+    parser.add_argument("--days", type=int, default=7, help="Age of the finished jobs to drop (prune)")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+        worker = jobs.JobWorker(SessionLocal, args.threads)
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stop()
+        return 0
+
+    db = SessionLocal()
+    try:
+        if args.command == "prune":
+            print(f"{jobs.prune(db, timedelta(days=args.days))} jobs pruned")
+            return 0
+
+        query = select(Job).order_by(Job.created_at.desc()).limit(100)
+        if args.status:
+            query = query.where(Job.status == args.status)
+        for job in db.execute(query).scalars():
+            print(f"{job.id} {job.tipo:15} {job.status.value:8} tenant={job.tenant_id} "
+                  f"attempts={job.attempts}/{job.max_attempts} created={job.created_at:%Y-%m-%d %H:%M:%S}")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
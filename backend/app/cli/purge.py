@@ -0,0 +1,55 @@
+"""
+Tenant and grupo purge command
+
+Deletes in chunks (PURGE_CHUNK_SIZE / PURGE_PAUSE_MS), like the API does in
+the background. Also finishes purges that were interrupted: `orphans` purges
+every tenant left without members.
+
+Usage:
+    python -m app.cli.purge tenant TENANT_ID
+    python -m app.cli.purge grupo TENANT_ID --grupo-id GRUPO_ID
+    python -m app.cli.purge orphans
+"""
+import argparse
+import sys
+from sqlalchemy import select
+from app.core.database import SessionLocal
+from app.models.tenant import Tenant, TenantUser
+from app.services import purge
+
+def orphan_tenants() -> list:
+    db = SessionLocal()
+    try:
+        return list(db.execute(
+            select(Tenant.id).where(~select(TenantUser.id).where(TenantUser.tenant_id == Tenant.id).exists())
+        ).scalars())
+    finally:
+        db.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Delete tenants or grupos with all their gastos, in chunks")
+    parser.add_argument("command", choices=["tenant", "grupo", "orphans"])
+    parser.add_argument("tenant_id", nargs="?")
+    parser.add_argument("--grupo-id", help="Grupo to delete (grupo command)")
+    args = parser.parse_args(argv)
+
+    if args.command == "orphans":
+        tenant_ids = orphan_tenants()
+    elif not args.tenant_id or (args.command == "grupo" and not args.grupo_id):
+        parser.error(f"{args.command} needs TENANT_ID" + (" and --grupo-id" if args.command == "grupo" else ""))
+    else:
+        tenant_ids = [args.tenant_id]
+
+    if args.command == "grupo":
+        deleted = purge.purge_grupo(SessionLocal, args.tenant_id, args.grupo_id)
+        print(f"Grupo {args.grupo_id} purged: {deleted} gastos")
+        return 0
+
+    for tenant_id in tenant_ids:
+        deleted = purge.purge_tenant(SessionLocal, tenant_id)
+        print(f"Tenant {tenant_id} purged: {deleted} gastos")
+    print(f"{len(tenant_ids)} tenants purged")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
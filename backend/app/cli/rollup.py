@@ -0,0 +1,38 @@
+"""
+Rollup admin command
+
+Usage:
+    python -m app.cli.rollup rebuild [--tenant-id ID]
+    python -m app.cli.rollup check [--tenant-id ID]
+"""
+import argparse
+import sys
+from app.core.database import SessionLocal
+from app.services import rollup
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild or verify the monthly gastos rollup")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tenant-id", help="Limit to a single tenant")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            count = rollup.rebuild(db, args.tenant_id)
+            print(f"Rollup rebuilt: {count} buckets")
+            return 0
+
+        mismatches = rollup.check(db, args.tenant_id)
+        for m in mismatches:
+            print(
+                f"{m['tenant_id']} {m['ano_mes']} categoria={m['categoria_id']} grupo={m['grupo_id']}: "
+                f"esperado={m['esperado']} atual={m['atual']}"
+            )
+        print(f"Rollup check: {len(mismatches)} mismatching buckets")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
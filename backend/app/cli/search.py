@@ -0,0 +1,26 @@
+"""
+Search index admin command
+
+Usage:
+    python -m app.cli.search rebuild
+"""
+import argparse
+import sys
+from app.core.database import SessionLocal
+from app.services import search
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the gasto full-text search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        search.rebuild_index(db)
+        print("Search index rebuilt")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
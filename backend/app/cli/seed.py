@@ -0,0 +1,172 @@
+"""
+Synthetic data generator for benchmarks and local testing
+
+Creates tenants with users, grupos, categorias and gastos. Gastos are spread
+across tenants with a Zipf-like skew, so a few tenants are giant and most
+are small. Output is deterministic for a given --seed: dates count back
+from --today, which defaults to the fixed SEED_TODAY rather than the real
+date, so runs on different days see the same data. Every user gets the
+password SEED_PASSWORD and an email like seed-<tenant>-<user>@example.com
+(user 0 owns the tenant), so seed an empty database.
+
+Usage:
+    python -m app.cli.seed [--tenants 50] [--gastos 100000] [--users 3]
+                           [--grupos 3] [--categorias 8] [--skew 1.2] [--seed 42]
+                           [--today 2025-06-30]
+"""
+import argparse
+import random
+import sys
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.hashing import pwd_context
+from app.models.categoria import Categoria
+from app.models.gasto import Gasto
+from app.models.grupo import Grupo, TipoGrupoEnum
+from app.models.tenant import RoleEnum, Tenant, TenantUser
+from app.models.user import User
+from app.services import rollup
+
+SEED_PASSWORD = "seed-password"
+INSERT_BATCH_SIZE = 5000
+DAYS_OF_HISTORY = 730
+# Last day of the generated history
+SEED_TODAY = date(2025, 6, 30)
+
+CATEGORIAS = [
+    "Alimentação", "Transporte", "Moradia", "Saúde", "Lazer", "Educação",
+    "Vestuário", "Serviços", "Impostos", "Viagem", "Pets", "Presentes",
+]
+DESCRICOES = [
+    "Supermercado", "Uber", "Farmácia", "Padaria", "Aluguel", "Conta de luz",
+    "Internet", "Restaurante", "Cinema", "Posto de gasolina", "Mensalidade",
+    "Açougue", "Feira", "Estacionamento", "Streaming", "Academia", "Pedágio",
+]
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def seed_email(tenant_index: int, user_index: int) -> str:
+    return f"seed-{tenant_index}-{user_index}@example.com"
+
+def tenant_sizes(tenants: int, gastos: int, skew: float) -> List[int]:
+    """Split `gastos` across tenants with weight 1 / rank^skew"""
+    weights = [1 / (rank + 1) ** skew for rank in range(tenants)]
+    total = sum(weights)
+    sizes = [int(gastos * weight / total) for weight in weights]
+    sizes[0] += gastos - sum(sizes)
+    return sizes
+
+def _insert(db: Session, model, rows: List[dict]) -> None:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + INSERT_BATCH_SIZE])
+
+def seed(
+    db: Session,
+    tenants: int = 50,
+    gastos: int = 100000,
+    users: int = 3,
+    grupos: int = 3,
+    categorias: int = 8,
+    skew: float = 1.2,
+    seed_value: int = 42,
+    today: Optional[date] = None
+) -> dict:
+    """Insert the synthetic data set and rebuild the rollup. Returns a summary."""
+    rng = random.Random(seed_value)
+    password_hash = pwd_context.hash(SEED_PASSWORD)
+    today = today or SEED_TODAY
+    now = datetime.combine(today, time())
+    sizes = tenant_sizes(tenants, gastos, skew)
+
+    for tenant_index, size in enumerate(sizes):
+        tenant_id = _uuid(rng)
+        user_ids = [_uuid(rng) for _ in range(users)]
+        grupo_ids = [_uuid(rng) for _ in range(grupos)]
+        categoria_ids = [_uuid(rng) for _ in range(categorias)]
+
+        db.execute(insert(Tenant), [{"id": tenant_id, "nome": f"Seed {tenant_index}", "plano": "free", "created_at": now}])
+        _insert(db, User, [
+            {"id": user_id, "nome": f"Seed {tenant_index}-{i}", "email": seed_email(tenant_index, i),
+             "password_hash": password_hash, "created_at": now}
+            for i, user_id in enumerate(user_ids)
+        ])
+        _insert(db, TenantUser, [
+            {"id": _uuid(rng), "tenant_id": tenant_id, "user_id": user_id,
+             "role": RoleEnum.owner if i == 0 else RoleEnum.member, "created_at": now}
+            for i, user_id in enumerate(user_ids)
+        ])
+        if grupo_ids:
+            _insert(db, Grupo, [
+                {"id": grupo_id, "tenant_id": tenant_id, "nome": f"Grupo {i}",
+                 "tipo": rng.choice(list(TipoGrupoEnum)), "created_at": now}
+                for i, grupo_id in enumerate(grupo_ids)
+            ])
+        if categoria_ids:
+            _insert(db, Categoria, [
+                {"id": categoria_id, "tenant_id": tenant_id, "nome": CATEGORIAS[i % len(CATEGORIAS)],
+                 "tipo": "despesa", "created_at": now}
+                for i, categoria_id in enumerate(categoria_ids)
+            ])
+
+        rows = []
+        for _ in range(size):
+            rows.append({
+                "id": _uuid(rng),
+                "tenant_id": tenant_id,
+                "user_id": rng.choice(user_ids),
+                # Most gastos are personal; categorias follow their own skew
+                "grupo_id": rng.choice(grupo_ids) if grupo_ids and rng.random() < 0.3 else None,
+                "categoria_id": categoria_ids[min(int(rng.paretovariate(1.5)) - 1, len(categoria_ids) - 1)]
+                if categoria_ids and rng.random() < 0.9 else None,
+                "valor": round(rng.lognormvariate(3.5, 1.0), 2),
+                "data": today - timedelta(days=rng.randrange(DAYS_OF_HISTORY)),
+                "descricao": f"{rng.choice(DESCRICOES)} {rng.randrange(1000)}",
+                "created_at": now,
+            })
+            if len(rows) >= INSERT_BATCH_SIZE:
+                _insert(db, Gasto, rows)
+                rows = []
+        _insert(db, Gasto, rows)
+        db.commit()
+
+    buckets = rollup.rebuild(db)
+    return {"tenants": tenants, "gastos": sum(sizes), "largest_tenant": max(sizes, default=0), "rollup_buckets": buckets}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic tenants and gastos")
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--gastos", type=int, default=100000, help="Total gastos across all tenants")
+    parser.add_argument("--users", type=int, default=3, help="Users per tenant (at least 1)")
+    parser.add_argument("--grupos", type=int, default=3, help="Grupos per tenant")
+    parser.add_argument("--categorias", type=int, default=8, help="Categorias per tenant")
+    parser.add_argument("--skew", type=float, default=1.2, help="0 = even; higher = a few giant tenants")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, default=SEED_TODAY,
+                        help="Last day of the generated history (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        summary = seed(
+            db,
+            tenants=args.tenants,
+            gastos=args.gastos,
+            users=max(args.users, 1),
+            grupos=args.grupos,
+            categorias=args.categorias,
+            skew=args.skew,
+            seed_value=args.seed,
+            today=args.today
+        )
+        print(f"Seeded: {summary}")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,20 @@
 Application Configuration
 """
 import os
+import tempfile
 from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def async_database_url(url: str) -> str:
+    """Driver URL for the async engine: aiosqlite on SQLite, psycopg (async) on Postgres"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+psycopg:" + url.split(":", 1)[1]
+    return url
+
 class Settings:
     PROJECT_NAME: str = "Controle Financeiro SaaS"
     VERSION: str = "1.0.0"
@@ -14,11 +23,73 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    # Used by the API; derived from DATABASE_URL unless set explicitly
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+    # Read replica for GET endpoints; empty = read-only connections to DATABASE_URL
+    READ_DATABASE_URL: str = os.getenv("READ_DATABASE_URL", "")
+    ASYNC_READ_DATABASE_URL: str = os.getenv("ASYNC_READ_DATABASE_URL") or async_database_url(READ_DATABASE_URL or ASYNC_DATABASE_URL)
+    
+    # Connection pool (per engine, per worker)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds waiting for a connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 = never
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # SQLite pragmas applied to every connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Refuse to start the production server when migrations are pending
+    SCHEMA_CHECK: bool = os.getenv("SCHEMA_CHECK", "true").lower() == "true"
     
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours
+    # Carry nome/email in the token so authentication never needs the users table
+    AUTH_TOKEN_CLAIMS: bool = os.getenv("AUTH_TOKEN_CLAIMS", "false").lower() == "true"
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))  # verified tokens per worker
+    # How long a worker may keep accepting a token revoked on another worker
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    
+    # Password hashing pool (0 workers = hash inline)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_DEPTH: int = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "16"))
+    PASSWORD_HASH_RETRY_AFTER: int = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))  # seconds
+    
+    # Tenant membership cache (per worker)
+    MEMBERSHIP_CACHE_SIZE: int = int(os.getenv("MEMBERSHIP_CACHE_SIZE", "10000"))
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = int(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "60"))
+    
+    # Columnar analytics cache (per worker), evicted whole tenants at a time
+    ANALYTICS_CACHE_MAX_MB: int = int(os.getenv("ANALYTICS_CACHE_MAX_MB", "256"))
+    
+    # Validate rows against the response schema on list endpoints (off = serialize rows as-is)
+    RESPONSE_VALIDATION: bool = os.getenv("RESPONSE_VALIDATION", "false").lower() == "true"
+    
+    # Tenant and grupo purges delete gastos in chunks, pausing between them
+    PURGE_CHUNK_SIZE: int = int(os.getenv("PURGE_CHUNK_SIZE", "1000"))
+    PURGE_PAUSE_MS: int = int(os.getenv("PURGE_PAUSE_MS", "50"))
+    
+    # Background jobs (app.services.jobs); 0 threads = run them only with `python -m app.cli.jobs worker`
+    JOB_WORKER_THREADS: int = int(os.getenv("JOB_WORKER_THREADS", "1"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+    JOB_TENANT_CONCURRENCY: int = int(os.getenv("JOB_TENANT_CONCURRENCY", "1"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_DELAY_SECONDS: int = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))  # doubles on each retry
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+    JOB_RESULT_DIR: str = os.getenv("JOB_RESULT_DIR", os.path.join(tempfile.gettempdir(), "finance-hub-jobs"))
+    
+    # Prometheus metrics on /metrics; statements slower than SLOW_QUERY_MS are logged
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "200"))
+    
+    # Request profiling for holders of PROFILING_TOKEN (empty = off, with no overhead)
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "finance-hub-profiles"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_KEEP: int = int(os.getenv("PROFILE_KEEP", "50"))
     
     # CORS
     CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000,http://localhost:8080").split(",")
@@ -1,25 +1,82 @@
 """
 Database Configuration and Session Management
+
+The API runs on the async engine. The sync engine is kept for migrations,
+command line tools and other code that runs outside the event loop.
+GET endpoints that tolerate replica lag read through `async_read_engine`.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# Handle SQLite connection args
-connect_args = {}
-if settings.DATABASE_URL.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
+def engine_options(url: str) -> dict:
+    """Pool settings, plus the SQLite connect args; in-memory SQLite keeps its default pool"""
+    parsed = make_url(url)
+    options = {}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
+
+def configure_sqlite(engine: Engine, read_only: bool = False) -> None:
+    """
+    Apply the SQLite pragmas on every new connection. In WAL mode readers
+    and the writer no longer block each other. Foreign keys are enforced, so
+    ON DELETE CASCADE / SET NULL behave as on Postgres.
+    """
+    if engine.dialect.name != "sqlite":
+        return
 
-engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS:d}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if not read_only:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **engine_options(settings.ASYNC_DATABASE_URL))
+configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# A separate in-memory SQLite database would be empty, so it shares the writer
+if settings.ASYNC_READ_DATABASE_URL == settings.ASYNC_DATABASE_URL and ":memory:" in settings.ASYNC_DATABASE_URL:
+    async_read_engine = async_engine
+else:
+    async_read_engine = create_async_engine(
+        settings.ASYNC_READ_DATABASE_URL,
+        **engine_options(settings.ASYNC_READ_DATABASE_URL)
+    )
+    configure_sqlite(async_read_engine.sync_engine, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Dependency for read-only endpoints: a session on the replica (may lag the writer)"""
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,37 @@
+"""
+Keyset pagination shared by the list routes
+
+A cursor is the sort key of the last row of a page: its parts joined with
+"|" and base64url-encoded without padding. Routes send it in X-Next-Cursor
+and read it back from the `cursor` query parameter.
+"""
+import base64
+import binascii
+from typing import Any, Callable
+from fastapi import HTTPException, status
+
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(*parts: Any) -> str:
+    """Opaque cursor from the sort key of a row (dates and floats round-trip through str)"""
+    raw = "|".join(str(part) for part in parts).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: Callable[[str], Any]) -> tuple:
+    """
+    Parse a cursor back into its parts, converting each with the matching
+    callable of `types` (e.g. date.fromisoformat, float, str). Malformed
+    cursors are a 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.b64decode(padded, altchars=b"-_", validate=True).decode()
+        parts = raw.split("|", len(types) - 1)
+        if len(parts) != len(types):
+            raise ValueError("wrong number of cursor parts")
+        return tuple(convert(part) for convert, part in zip(types, parts))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -0,0 +1,246 @@
+"""
+On-demand request profiling for admins
+
+A request carrying `X-Profile-Token: <PROFILING_TOKEN>` runs under a sampling
+profiler: a thread samples the stacks of the worker's threads every
+PROFILE_INTERVAL_MS, and the SQL statements the request issues are recorded
+with their timings and explained once the response is ready. The profile is
+written to PROFILE_DIR (shared by the workers) before the last body chunk is
+sent, and its id comes back in the `X-Profile-Id` response header.
+
+Stacks are stored in the collapsed format (`frame;frame;frame count`) read by
+flamegraph.pl, speedscope and similar tools. Other requests served by the
+same worker at the same time show up in the samples too.
+
+With PROFILING_TOKEN unset, neither the middleware nor the SQL hooks are
+installed, so requests pay nothing.
+"""
+import asyncio
+import json
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.database import async_engine
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE")
+MAX_QUERIES = 1000
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+def is_profiling_token(value: Optional[str]) -> bool:
+    """Whether `value` is the configured token (always False when profiling is off)"""
+    return bool(settings.PROFILING_TOKEN and value) and secrets.compare_digest(value, settings.PROFILING_TOKEN)
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({'/'.join(path.parts[-2:])}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples the stacks of every other thread into collapsed-stack counts"""
+
+    # Innermost frames of threads parked on a queue or lock, waiting for work
+    IDLE_FILES = ("threading.py", "queue.py", "concurrent/futures/thread.py")
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_filename.endswith(self.IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+class RequestProfile:
+    """What one profiled request did"""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.queries: List[dict] = []
+        self.recording = True
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and profile.recording:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is None or not profile.recording:
+        return
+    elapsed = time.perf_counter() - conn.info["profile_started"].pop()
+    if len(profile.queries) < MAX_QUERIES:
+        profile.queries.append({
+            "statement": statement,
+            "parameters": None if executemany else parameters,
+            "duration_ms": round(elapsed * 1000, 3),
+            "dialect": conn.dialect.name,
+        })
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the statements of profiled requests run on `engine`"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+async def explain(statement: str, parameters, dialect: str) -> List[str]:
+    """Plan of a captured statement; EXPLAIN without ANALYZE, so writes are not run"""
+    async with async_engine.connect() as conn:
+        if dialect == "sqlite":
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            return [row[-1] for row in rows]
+        rows = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).all()
+        await conn.rollback()
+        return [row[0] for row in rows]
+
+async def explain_queries(queries: List[dict]) -> Dict[str, List[str]]:
+    """Plans of the distinct explainable statements, by statement"""
+    plans = {}
+    for query in queries:
+        statement = query["statement"]
+        if statement in plans or query["parameters"] is None:
+            continue
+        if not statement.lstrip().upper().startswith(EXPLAINED):
+            continue
+        try:
+            plans[statement] = await explain(statement, query["parameters"], query["dialect"])
+        except Exception as exc:
+            plans[statement] = [f"EXPLAIN failed: {exc}"]
+    return plans
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """File of a stored profile, or None for ids that are not ours"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    return Path(settings.PROFILE_DIR) / f"{profile_id}.json"
+
+def save_profile(document: dict) -> None:
+    """Write a profile and drop the oldest beyond PROFILE_KEEP"""
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{document['id']}.json"
+    partial = target.with_suffix(".tmp")
+    partial.write_text(json.dumps(document, default=str))
+    partial.replace(target)
+
+    stored = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in stored[settings.PROFILE_KEEP:]:
+        old.unlink(missing_ok=True)
+
+def list_profiles() -> List[dict]:
+    """Summaries of the stored profiles, newest first"""
+    summaries = []
+    stored = sorted(Path(settings.PROFILE_DIR).glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in stored:
+        try:
+            document = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        summary = {key: document[key] for key in ("id", "method", "path", "status", "started_at", "duration_ms")}
+        summary["queries"] = len(document["queries"])
+        summaries.append(summary)
+    return summaries
+
+class ProfilingMiddleware:
+    """Profiles requests that carry the profiling token; others pass straight through"""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = PROFILE_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = next((value for name, value in scope["headers"] if name == self.header), None)
+        if token is None or not is_profiling_token(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        context_token = current_profile.set(profile)
+        sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+        status = None
+        started = time.perf_counter()
+
+        async def finish():
+            profile.recording = False
+            # Joining the sampler thread and writing the file block; keep them off the event loop
+            await asyncio.to_thread(sampler.stop)
+            duration = time.perf_counter() - started
+            plans = await explain_queries(profile.queries)
+            await asyncio.to_thread(save_profile, {
+                "id": profile.id,
+                "method": profile.method,
+                "path": profile.path,
+                "query_string": scope["query_string"].decode("latin-1"),
+                "status": status,
+                "started_at": profile.started_at.isoformat(),
+                "duration_ms": round(duration * 1000, 3),
+                "db_time_ms": round(sum(q["duration_ms"] for q in profile.queries), 3),
+                "sample_interval_ms": settings.PROFILE_INTERVAL_MS,
+                "queries": [
+                    {"statement": q["statement"], "duration_ms": q["duration_ms"], "plan": plans.get(q["statement"])}
+                    for q in profile.queries
+                ],
+                "collapsed": sampler.collapsed(),
+            })
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())],
+                }
+            elif message["type"] == "http.response.body" and not message.get("more_body", False) and profile.recording:
+                # Store the profile before the client sees the end of the response
+                await finish()
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(context_token)
+            if profile.recording:
+                profile.recording = False
+                await asyncio.to_thread(sampler.stop)
@@ -0,0 +1,45 @@
+"""
+Fast JSON responses for list endpoints
+
+Returning Pydantic models through `response_model` validates every item twice
+(once when the route builds it, again when FastAPI checks the response).
+List routes instead hand their DB rows to a ListSerializer and return its
+bytes directly: with RESPONSE_VALIDATION the rows are validated once by a
+TypeAdapter and dumped by pydantic-core, without it they go straight to
+orjson. The declared response_model still documents the payload.
+"""
+from typing import Iterable, List, Mapping, Optional, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from app.core.config import settings
+
+class ListSerializer:
+    """Serialize row mappings as a JSON array of `model`"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+        self.fields = tuple(model.model_fields)
+
+    def item(self, mapping: Mapping) -> dict:
+        """The model's fields of one row, unvalidated"""
+        return {field: mapping.get(field) for field in self.fields}
+
+    def dump_item(self, mapping: Mapping) -> bytes:
+        if settings.RESPONSE_VALIDATION:
+            return self.model.model_validate(dict(mapping)).model_dump_json().encode()
+        return orjson.dumps(self.item(mapping))
+
+    def dump(self, mappings: Iterable[Mapping]) -> bytes:
+        if settings.RESPONSE_VALIDATION:
+            return self.adapter.dump_json(self.adapter.validate_python([dict(m) for m in mappings]))
+        return orjson.dumps([self.item(mapping) for mapping in mappings])
+
+    def response(self, rows: Iterable, headers: Optional[dict] = None) -> Response:
+        """JSON response from SQLAlchemy rows (or anything with `_mapping`)"""
+        return Response(
+            self.dump(row._mapping for row in rows),
+            media_type="application/json",
+            headers=headers
+        )
@@ -0,0 +1,28 @@
+"""
+Database schema version check
+
+The schema is managed by Alembic and never created by the app. The production
+server checks once, in the master process, that the database is at the latest
+revision instead of every worker touching the DB at import time.
+"""
+from pathlib import Path
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the latest migration"""
+
+def check_schema(engine: Engine) -> None:
+    """Raise SchemaOutOfDate unless the database is at the migration head(s)"""
+    heads = set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != heads:
+        raise SchemaOutOfDate(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(heads)}; "
+            "run `alembic upgrade head`"
+        )
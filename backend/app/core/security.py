@@ -1,27 +1,48 @@
 """
 Security utilities: JWT and Password hashing
 """
+import hashlib
+from collections import namedtuple
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import hashing
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+# Verified tokens, keyed by SHA-256 of the token and expiring at its `exp`
+# or after AUTH_CACHE_TTL_SECONDS, when the token version is checked again
+TokenIdentity = namedtuple("TokenIdentity", ["id", "nome", "email"])
+token_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+def _hashing_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash on the hashing pool"""
+    try:
+        return await hashing.password_pool.verify_async(plain_password, hashed_password)
+    except hashing.HashingOverloaded:
+        raise _hashing_overloaded()
+
+async def get_password_hash(password: str) -> str:
+    """Hash a password on the hashing pool"""
+    try:
+        return await hashing.password_pool.hash_async(password)
+    except hashing.HashingOverloaded:
+        raise _hashing_overloaded()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -34,6 +55,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def user_token_claims(user: User) -> dict:
+    """Claims identifying a user in an access token"""
+    claims = {"sub": user.id, "ver": user.token_version or 0}
+    if settings.AUTH_TOKEN_CLAIMS:
+        claims.update(nome=user.nome, email=user.email)
+    return claims
+
+async def invalidate_user_tokens(db: AsyncSession, user: User) -> None:
+    """
+    Reject the tokens issued so far for a user and commit.
+    Call when a user changes credentials. This worker forgets the tokens at
+    once; other workers within AUTH_CACHE_TTL_SECONDS.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+    token_cache.discard_where(lambda key, identity: identity.id == user.id)
+
 def decode_token(token: str) -> Optional[dict]:
     """Decode and validate a JWT token"""
     try:
@@ -44,15 +82,25 @@ def decode_token(token: str) -> Optional[dict]:
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
-    """Get the current authenticated user from JWT token"""
+    """
+    Get the current authenticated user from JWT token.
+    Verified tokens are cached, so the returned User may be a transient
+    instance carrying only id, nome and email. A token is valid while its
+    `ver` matches the user's token_version, read again on every cache miss.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    identity = token_cache.get(digest)
+    if identity is not None:
+        return User(id=identity.id, nome=identity.nome, email=identity.email)
+    
     payload = decode_token(token)
     if payload is None:
         raise credentials_exception
@@ -61,8 +109,15 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    if "nome" in payload and "email" in payload:
+        token_version = (await db.execute(select(User.token_version).where(User.id == user_id))).scalar_one_or_none()
+        user = User(id=user_id, nome=payload["nome"], email=payload["email"])
+    else:
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        token_version = user.token_version if user is not None else None
+    
+    if token_version is None or payload.get("ver", 0) != token_version:
         raise credentials_exception
     
+    token_cache.set(digest, TokenIdentity(user.id, user.nome, user.email), expires_at=payload.get("exp"))
     return user
@@ -2,19 +2,35 @@
 FastAPI Application Entry Point
 SaaS Multi-tenant de Controle Financeiro
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import auth, tenants, grupos, categorias, gastos, dashboard
+from app.api.v1 import auth, tenants, grupos, categorias, gastos, dashboard, jobs, profiles
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import async_engine, async_read_engine, engine
+from app.core import metrics, profiling
+from app.core.hashing import password_pool
+from app.core.security import token_cache
+from app.api.v1.deps import membership_cache
+from app.services.analytics import analytics_cache
+from app.services.jobs import job_worker
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.JOB_WORKER_THREADS > 0:
+        job_worker.start()
+    yield
+    if settings.JOB_WORKER_THREADS > 0:
+        job_worker.stop()
+    password_pool.shutdown()
+    await async_read_engine.dispose()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -24,8 +40,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", profiling.PROFILE_ID_HEADER],
 )
 
+instrumented_engines = (engine, async_engine.sync_engine, async_read_engine.sync_engine)
+
+# Only requests with the profiling token pay for profiling; without a token nothing is installed
+if settings.PROFILING_TOKEN:
+    app.add_middleware(profiling.ProfilingMiddleware)
+    for instrumented in instrumented_engines:
+        profiling.instrument_engine(instrumented)
+
+# Metrics wrap everything, CORS and profiling included, so every response is timed
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    for instrumented in instrumented_engines:
+        metrics.instrument_engine(instrumented)
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(tenants.router, prefix=f"{settings.API_V1_STR}/tenants", tags=["tenants"])
@@ -33,6 +64,9 @@ app.include_router(grupos.router, prefix=f"{settings.API_V1_STR}/grupos", tags=[
 app.include_router(categorias.router, prefix=f"{settings.API_V1_STR}/categorias", tags=["categorias"])
 app.include_router(gastos.router, prefix=f"{settings.API_V1_STR}/gastos", tags=["gastos"])
 app.include_router(dashboard.router, prefix=f"{settings.API_V1_STR}/dashboard", tags=["dashboard"])
+app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["jobs"])
+if settings.PROFILING_TOKEN:
+    app.include_router(profiles.router, prefix=f"{settings.API_V1_STR}/profiles", tags=["profiles"])
 
 @app.get("/")
 def root():
@@ -41,3 +75,19 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/caches")
+def cache_stats():
+    """Per-worker cache hit/miss counters, for sizing the caches"""
+    return {
+        "tokens": token_cache.stats(),
+        "memberships": membership_cache.stats(),
+        "analytics": analytics_cache.stats(),
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        """Prometheus exposition, aggregated across workers under gunicorn"""
+        body, content_type = metrics.render_metrics()
+        return Response(body, media_type=content_type)
@@ -4,5 +4,7 @@ from app.models.tenant import Tenant, TenantUser
 from app.models.grupo import Grupo
 from app.models.categoria import Categoria
 from app.models.gasto import Gasto
+from app.models.resumo import ResumoMensal
+from app.models.job import Job
 
-__all__ = ["User", "Tenant", "TenantUser", "Grupo", "Categoria", "Gasto"]
+__all__ = ["User", "Tenant", "TenantUser", "Grupo", "Categoria", "Gasto", "ResumoMensal", "Job"]
@@ -11,14 +11,14 @@ class Categoria(Base):
     __tablename__ = "categorias"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
     nome = Column(String(255), nullable=False)
     tipo = Column(String(50), default="despesa")  # despesa, receita
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     tenant = relationship("Tenant", back_populates="categorias")
-    gastos = relationship("Gasto", back_populates="categoria")
+    gastos = relationship("Gasto", back_populates="categoria", passive_deletes=True)  # ON DELETE SET NULL
     
     def __repr__(self):
         return f"<Categoria {self.nome}>"
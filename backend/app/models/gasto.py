@@ -3,12 +3,22 @@ Gasto Model
 """
 import uuid
 from datetime import datetime, date
-from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Date, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Date, Text, Index, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Gasto(Base):
     __tablename__ = "gastos"
+    __table_args__ = (
+        Index("ix_gastos_tenant_data", "tenant_id", "data", "id"),
+        Index("ix_gastos_tenant_categoria", "tenant_id", "categoria_id"),
+        Index("ix_gastos_tenant_grupo", "tenant_id", "grupo_id"),
+        # For the ON DELETE SET NULL lookups when a grupo or categoria is deleted
+        Index("ix_gastos_grupo", "grupo_id",
+              sqlite_where=text("grupo_id IS NOT NULL"), postgresql_where=text("grupo_id IS NOT NULL")),
+        Index("ix_gastos_categoria", "categoria_id",
+              sqlite_where=text("categoria_id IS NOT NULL"), postgresql_where=text("categoria_id IS NOT NULL")),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
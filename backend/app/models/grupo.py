@@ -17,14 +17,16 @@ class Grupo(Base):
     __tablename__ = "grupos"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
     nome = Column(String(255), nullable=False)
     tipo = Column(Enum(TipoGrupoEnum), default=TipoGrupoEnum.familia)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     tenant = relationship("Tenant", back_populates="grupos")
-    gastos = relationship("Gasto", back_populates="grupo", cascade="all, delete-orphan")
+    # Deleting a grupo deletes its gastos (app.services.purge) before the row;
+    # the ORM never loads them for that
+    gastos = relationship("Gasto", back_populates="grupo", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Grupo {self.nome}>"
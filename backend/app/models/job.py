@@ -0,0 +1,45 @@
+"""
+Job Model
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Enum, Index
+import enum
+from app.core.database import Base
+
+class JobStatusEnum(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class Job(Base):
+    """
+    Background work queued in the database (see app.services.jobs).
+    tenant_id has no foreign key: a tenant purge job outlives its tenant.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_tenant_created", "tenant_id", "created_at"),
+    )
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = Column(String(36), nullable=True)
+    user_id = Column(String(36), nullable=True)
+    tipo = Column(String(50), nullable=False)
+    status = Column(Enum(JobStatusEnum), nullable=False, default=JobStatusEnum.pending)
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<Job {self.tipo} {self.status}>"
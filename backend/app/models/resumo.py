@@ -0,0 +1,36 @@
+"""
+ResumoMensal Model
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Integer, Index, func, literal_column
+from app.core.database import Base
+
+class ResumoMensal(Base):
+    """
+    Monthly rollup of gastos per (tenant, month, categoria, grupo).
+    Maintained in the same transaction as every gasto write.
+    """
+    __tablename__ = "resumos_mensais"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    ano_mes = Column(String(7), nullable=False)  # YYYY-MM
+    categoria_id = Column(String(36), nullable=True)
+    grupo_id = Column(String(36), nullable=True)  # NULL = gastos pessoais
+    total = Column(Float, nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ResumoMensal {self.ano_mes} {self.total}>"
+
+# One row per bucket. NULL ids are folded to '' so pessoais/uncategorized
+# buckets are unique too (SQLite has no NULLS NOT DISTINCT).
+BUCKET_KEY = (
+    ResumoMensal.tenant_id,
+    ResumoMensal.ano_mes,
+    func.coalesce(ResumoMensal.categoria_id, literal_column("''")),
+    func.coalesce(ResumoMensal.grupo_id, literal_column("''")),
+)
+Index("uq_resumos_mensais_chave", *BUCKET_KEY, unique=True)
@@ -3,7 +3,7 @@ Tenant and TenantUser Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum, Index, Integer
 from sqlalchemy.orm import relationship
 import enum
 from app.core.database import Base
@@ -20,18 +20,25 @@ class Tenant(Base):
     nome = Column(String(255), nullable=False)
     plano = Column(String(50), default="free")
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped once by every transaction that changes the tenant's gastos (see app.services.analytics)
+    analytics_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
-    tenant_users = relationship("TenantUser", back_populates="tenant", cascade="all, delete-orphan")
-    grupos = relationship("Grupo", back_populates="tenant", cascade="all, delete-orphan")
-    categorias = relationship("Categoria", back_populates="tenant", cascade="all, delete-orphan")
-    gastos = relationship("Gasto", back_populates="tenant", cascade="all, delete-orphan")
+    # The ON DELETE CASCADE foreign keys delete the children; the ORM never loads them for that
+    tenant_users = relationship("TenantUser", back_populates="tenant", cascade="all, delete-orphan", passive_deletes=True)
+    grupos = relationship("Grupo", back_populates="tenant", cascade="all, delete-orphan", passive_deletes=True)
+    categorias = relationship("Categoria", back_populates="tenant", cascade="all, delete-orphan", passive_deletes=True)
+    gastos = relationship("Gasto", back_populates="tenant", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Tenant {self.nome}>"
 
 class TenantUser(Base):
     __tablename__ = "tenant_users"
+    __table_args__ = (
+        Index("uq_tenant_users_tenant_user", "tenant_id", "user_id", unique=True),
+        Index("ix_tenant_users_user", "user_id"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id = Column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
@@ -3,7 +3,7 @@ User Model
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Integer
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -15,10 +15,12 @@ class User(Base):
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Tokens carry it as `ver`; bumping it revokes every token issued so far
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
-    tenant_users = relationship("TenantUser", back_populates="user", cascade="all, delete-orphan")
-    gastos = relationship("Gasto", back_populates="user", cascade="all, delete-orphan")
+    tenant_users = relationship("TenantUser", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    gastos = relationship("Gasto", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<User {self.email}>"
@@ -3,12 +3,16 @@ from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
 from app.schemas.tenant import TenantCreate, TenantResponse, TenantUserResponse, JoinTenantRequest
 from app.schemas.grupo import GrupoCreate, GrupoResponse
 from app.schemas.categoria import CategoriaCreate, CategoriaResponse
-from app.schemas.gasto import GastoCreate, GastoUpdate, GastoResponse
+from app.schemas.gasto import (
+    GastoCreate, GastoUpdate, GastoResponse, GastoImportError, GastoImportResult,
+    GastoBatchOperation, GastoBatchRequest, GastoBatchResult
+)
 
 __all__ = [
     "UserCreate", "UserResponse", "UserLogin", "Token",
     "TenantCreate", "TenantResponse", "TenantUserResponse", "JoinTenantRequest",
     "GrupoCreate", "GrupoResponse",
     "CategoriaCreate", "CategoriaResponse",
-    "GastoCreate", "GastoUpdate", "GastoResponse"
+    "GastoCreate", "GastoUpdate", "GastoResponse", "GastoImportError", "GastoImportResult",
+    "GastoBatchOperation", "GastoBatchRequest", "GastoBatchResult"
 ]
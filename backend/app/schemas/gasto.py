@@ -2,8 +2,8 @@
 Gasto Schemas
 """
 from datetime import datetime, date
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 
 class GastoCreate(BaseModel):
     grupo_id: Optional[str] = None  # NULL = gasto pessoal
@@ -35,3 +35,32 @@ class GastoResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class GastoImportError(BaseModel):
+    linha: int
+    erro: str
+
+class GastoImportResult(BaseModel):
+    importados: int
+    rejeitados: int
+    erros: List[GastoImportError]  # capped at the first 1000 rejected rows
+
+class GastoBatchOperation(GastoUpdate):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None  # required for update and delete
+    
+    @model_validator(mode="after")
+    def check_required_fields(self):
+        if self.op == "create" and (self.valor is None or self.data is None):
+            raise ValueError("create requires valor and data")
+        if self.op != "create" and not self.id:
+            raise ValueError(f"{self.op} requires id")
+        return self
+
+class GastoBatchRequest(BaseModel):
+    operacoes: List[GastoBatchOperation] = Field(..., min_length=1, max_length=1000)
+
+class GastoBatchResult(BaseModel):
+    op: str
+    id: str
+    gasto: Optional[GastoResponse] = None  # None for deletes
@@ -0,0 +1,31 @@
+"""
+Job Schemas
+"""
+from datetime import date, datetime
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+class ExportJobCreate(BaseModel):
+    format: Literal["csv", "ndjson", "columnar"] = "csv"
+    grupo_id: Optional[str] = None
+    categoria_id: Optional[str] = None
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    valor_min: Optional[float] = None
+    valor_max: Optional[float] = None
+
+class JobResponse(BaseModel):
+    id: str
+    tipo: str
+    status: str
+    tenant_id: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
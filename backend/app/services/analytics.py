@@ -0,0 +1,283 @@
+"""
+Per-tenant columnar cache for ad-hoc gasto aggregations
+
+Each tenant's gastos are held as NumPy arrays (dates as int days since the
+epoch, valor as int cents, small-int codes for categoria/grupo/user) so any
+group-by over them takes milliseconds. Tenants are loaded lazily and whole
+tenants are evicted LRU under a memory budget.
+
+Each worker keeps its own cache, tagged with the tenant's analytics_version:
+a counter every transaction that changes the tenant's gastos bumps once. A
+read whose version differs from the cached one reloads the tenant, which also
+picks up writes made by other workers. A local write that only adds gastos
+patches the copy in place when it took the version exactly one step past the
+cached one (no other write can be missing from it); anything else drops it.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import Select, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.models.gasto import Gasto
+from app.models.tenant import Tenant
+
+EPOCH = date(1970, 1, 1)
+CODE_DIMENSIONS = ("categoria", "grupo", "user")
+TIME_DIMENSIONS = ("dia", "semana", "mes", "ano")
+DIMENSIONS = CODE_DIMENSIONS + TIME_DIMENSIONS
+LOAD_BATCH_SIZE = 10000
+INITIAL_CAPACITY = 1024
+
+# (data, valor, categoria_id, grupo_id, user_id)
+GastoTuple = Tuple[date, float, Optional[str], Optional[str], str]
+
+def version_select(tenant_id: str) -> Select:
+    """Current analytics_version of a tenant"""
+    return select(Tenant.analytics_version).where(Tenant.id == tenant_id)
+
+def bump_version(db: Session, tenant_id: str) -> int:
+    """
+    Count a change to the tenant's gastos in the current transaction and
+    return the new version. Call it once per write transaction, before any
+    other write: the row lock it takes is what rollup.rebuild waits on.
+    Does not commit.
+    """
+    return db.execute(
+        update(Tenant).where(Tenant.id == tenant_id)
+        .values(analytics_version=Tenant.analytics_version + 1)
+        .returning(Tenant.analytics_version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+class Codes:
+    """Small-int codes for an id column; None is -1"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        return None if code < 0 else self.values[code]
+
+class TenantColumns:
+    """Columnar copy of one tenant's gastos"""
+
+    def __init__(self, version: Optional[int] = None):
+        self.version = version
+        self.size = 0
+        self.days = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.cents = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+        self.categoria = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.grupo = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.user = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.codes = {dimension: Codes() for dimension in CODE_DIMENSIONS}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ("days", "cents", "categoria", "grupo", "user"))
+
+    def _reserve(self, extra: int) -> None:
+        capacity = len(self.days)
+        needed = self.size + extra
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("days", "cents", "categoria", "grupo", "user"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, rows: Sequence[GastoTuple]) -> None:
+        if not rows:
+            return
+        self._reserve(len(rows))
+        start, end = self.size, self.size + len(rows)
+        self.days[start:end] = [(data - EPOCH).days for data, *_ in rows]
+        self.cents[start:end] = [round(valor * 100) for _, valor, *_ in rows]
+        self.categoria[start:end] = [self.codes["categoria"].code(row[2]) for row in rows]
+        self.grupo[start:end] = [self.codes["grupo"].code(row[3]) for row in rows]
+        self.user[start:end] = [self.codes["user"].code(row[4]) for row in rows]
+        self.size = end
+
+    def _keys(self, dimension: str, mask: np.ndarray) -> np.ndarray:
+        if dimension in CODE_DIMENSIONS:
+            return getattr(self, dimension)[:self.size][mask].astype(np.int64)
+        days = self.days[:self.size][mask].astype(np.int64)
+        if dimension == "dia":
+            return days
+        if dimension == "semana":
+            # 1970-01-01 was a Thursday; shift so weeks start on Monday
+            return (days + 3) // 7
+        unit = "M" if dimension == "mes" else "Y"
+        return days.astype("datetime64[D]").astype(f"datetime64[{unit}]").astype(np.int64)
+
+    def _label(self, dimension: str, key: int):
+        if dimension in CODE_DIMENSIONS:
+            return self.codes[dimension].value(int(key))
+        if dimension == "dia":
+            return EPOCH + timedelta(days=int(key))
+        if dimension == "semana":
+            return EPOCH + timedelta(days=int(key) * 7 - 3)
+        if dimension == "mes":
+            return f"{1970 + int(key) // 12:04d}-{int(key) % 12 + 1:02d}"
+        return 1970 + int(key)
+
+    def aggregate(
+        self,
+        group_by: Sequence[str],
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        valor_min: Optional[float] = None,
+        valor_max: Optional[float] = None,
+        **ids: Optional[str]
+    ) -> List[dict]:
+        """
+        Sum valor (and count gastos) per combination of `group_by` dimensions.
+        `ids` filters by categoria, grupo or user id.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        days = self.days[:self.size]
+        cents = self.cents[:self.size]
+        if data_inicio:
+            mask &= days >= (data_inicio - EPOCH).days
+        if data_fim:
+            mask &= days <= (data_fim - EPOCH).days
+        if valor_min is not None:
+            mask &= cents >= round(valor_min * 100)
+        if valor_max is not None:
+            mask &= cents <= round(valor_max * 100)
+        for dimension, value in ids.items():
+            if value is None:
+                continue
+            code = self.codes[dimension].index.get(value)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= getattr(self, dimension)[:self.size] == code
+
+        selected = cents[mask]
+        if not group_by:
+            return [{"total": int(selected.sum()) / 100, "quantidade": int(selected.size)}]
+        if selected.size == 0:
+            return []
+
+        keys = np.stack([self._keys(dimension, mask) for dimension in group_by])
+        unique, inverse = np.unique(keys, axis=1, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        totals = np.bincount(inverse, weights=selected, minlength=unique.shape[1])
+        counts = np.bincount(inverse, minlength=unique.shape[1])
+
+        return [
+            {
+                **{dimension: self._label(dimension, unique[i, j]) for i, dimension in enumerate(group_by)},
+                "total": round(totals[j]) / 100,
+                "quantidade": int(counts[j]),
+            }
+            for j in range(unique.shape[1])
+        ]
+
+def load_tenant(session_factory: sessionmaker, tenant_id: str) -> TenantColumns:
+    """
+    Read a tenant's gastos into columns (sync engine, run off the event loop).
+    The version is read before and after the gastos; when a write lands in
+    between the columns get no version, so they are never patched and the
+    next read reloads them.
+    """
+    db = session_factory()
+    try:
+        before = db.execute(version_select(tenant_id)).scalar_one()
+        columns = TenantColumns()
+        result = db.execute(
+            select(Gasto.data, Gasto.valor, Gasto.categoria_id, Gasto.grupo_id, Gasto.user_id)
+            .where(Gasto.tenant_id == tenant_id)
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            columns.append(rows)
+        if db.execute(version_select(tenant_id)).scalar_one() == before:
+            columns.version = before
+        return columns
+    finally:
+        db.close()
+
+class AnalyticsCache:
+    """LRU of TenantColumns bounded by total array memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._tenants: "OrderedDict[str, TenantColumns]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: str, version: int) -> Optional[TenantColumns]:
+        """Cached columns for a tenant, or None when missing or stale"""
+        with self._lock:
+            columns = self._tenants.get(tenant_id)
+            if columns is not None:
+                if columns.version == version:
+                    self._tenants.move_to_end(tenant_id)
+                    self.hits += 1
+                    return columns
+                del self._tenants[tenant_id]
+            self.misses += 1
+            return None
+
+    def put(self, tenant_id: str, columns: TenantColumns) -> None:
+        with self._lock:
+            self._tenants[tenant_id] = columns
+            self._tenants.move_to_end(tenant_id)
+            self._evict()
+
+    def append(self, tenant_id: str, version: int, rows: Sequence[GastoTuple]) -> None:
+        """
+        Add the gastos of a committed write that took the tenant to `version`.
+        Patched in place when the cached columns are exactly one write behind,
+        dropped when they have diverged.
+        """
+        with self._lock:
+            columns = self._tenants.get(tenant_id)
+            if columns is None:
+                return
+            if columns.version is not None and columns.version == version - 1:
+                columns.append(rows)
+                columns.version = version
+                self._evict()
+            else:
+                del self._tenants[tenant_id]
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+
+    def _evict(self) -> None:
+        total = sum(columns.nbytes for columns in self._tenants.values())
+        while total > self.max_bytes and len(self._tenants) > 1:
+            _, evicted = self._tenants.popitem(last=False)
+            total -= evicted.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tenants": len(self._tenants),
+                "bytes": sum(columns.nbytes for columns in self._tenants.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+analytics_cache = AnalyticsCache(max_bytes=settings.ANALYTICS_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,63 @@
+"""
+Encoders for streaming gasto exports
+
+Each encoder turns one batch of gasto rows (from the joined gasto projection)
+into a text chunk, so an export never holds more than one batch in memory.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+EXPORT_COLUMNS = [
+    "id", "data", "valor", "descricao",
+    "categoria_id", "categoria_nome",
+    "grupo_id", "grupo_nome",
+    "user_id", "user_nome",
+    "created_at",
+]
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_csv(rows: Sequence, first: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if first:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        mapping = row._mapping
+        writer.writerow([mapping[column] for column in EXPORT_COLUMNS])
+    return buffer.getvalue()
+
+def encode_ndjson(rows: Sequence, first: bool) -> str:
+    return "".join(
+        json.dumps({column: row._mapping[column] for column in EXPORT_COLUMNS}, default=_json_default) + "\n"
+        for row in rows
+    )
+
+def encode_columnar(rows: Sequence, first: bool) -> str:
+    """
+    One JSON record batch per line: {"rows": n, "columns": {name: [values...]}}.
+    Readers can load each column as an array without parsing row objects.
+    """
+    columns: Dict[str, List] = {column: [] for column in EXPORT_COLUMNS}
+    for row in rows:
+        mapping = row._mapping
+        for column in EXPORT_COLUMNS:
+            columns[column].append(mapping[column])
+    return json.dumps({"rows": len(rows), "columns": columns}, default=_json_default) + "\n"
+
+class ExportFormat(NamedTuple):
+    encode: Callable[[Sequence, bool], str]
+    media_type: str
+    extension: str
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat(encode_csv, "text/csv", "csv"),
+    "ndjson": ExportFormat(encode_ndjson, "application/x-ndjson", "ndjson"),
+    "columnar": ExportFormat(encode_columnar, "application/x-ndjson", "columnar.ndjson"),
+}
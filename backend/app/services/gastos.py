@@ -0,0 +1,70 @@
+"""
+Gasto queries shared by the API and the background jobs
+"""
+from datetime import date
+from typing import Optional, Tuple
+from sqlalchemy import Select, and_, or_, select
+from app.models.categoria import Categoria
+from app.models.gasto import Gasto
+from app.models.grupo import Grupo
+from app.models.user import User
+
+EXPORT_BATCH_SIZE = 2000
+
+def gasto_response_select() -> Select:
+    """Gasto columns plus related names, outer-joined in a single query"""
+    return select(
+        Gasto.id,
+        Gasto.tenant_id,
+        Gasto.user_id,
+        Gasto.grupo_id,
+        Gasto.categoria_id,
+        Gasto.valor,
+        Gasto.data,
+        Gasto.descricao,
+        Gasto.created_at,
+        Categoria.nome.label("categoria_nome"),
+        Grupo.nome.label("grupo_nome"),
+        User.nome.label("user_nome")
+    ).outerjoin(
+        Categoria, Categoria.id == Gasto.categoria_id
+    ).outerjoin(
+        Grupo, Grupo.id == Gasto.grupo_id
+    ).outerjoin(
+        User, User.id == Gasto.user_id
+    )
+
+def filter_gastos(
+    query: Select,
+    tenant_id: str,
+    grupo_id: Optional[str] = None,
+    categoria_id: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    valor_min: Optional[float] = None,
+    valor_max: Optional[float] = None,
+    cursor: Optional[Tuple[date, str]] = None
+) -> Select:
+    """Apply tenant scope, filters and keyset position, ordered by (data desc, id desc)"""
+    query = query.where(Gasto.tenant_id == tenant_id)
+    
+    if grupo_id:
+        query = query.where(Gasto.grupo_id == grupo_id)
+    if categoria_id:
+        query = query.where(Gasto.categoria_id == categoria_id)
+    if data_inicio:
+        query = query.where(Gasto.data >= data_inicio)
+    if data_fim:
+        query = query.where(Gasto.data <= data_fim)
+    if valor_min is not None:
+        query = query.where(Gasto.valor >= valor_min)
+    if valor_max is not None:
+        query = query.where(Gasto.valor <= valor_max)
+    if cursor:
+        cursor_data, cursor_id = cursor
+        query = query.where(or_(
+            Gasto.data < cursor_data,
+            and_(Gasto.data == cursor_data, Gasto.id < cursor_id)
+        ))
+    
+    return query.order_by(Gasto.data.desc(), Gasto.id.desc())
@@ -0,0 +1,202 @@
+"""
+Bulk import of bank statements (CSV and OFX) into gastos
+
+The upload has already been spooled to a temporary file by the framework;
+it is parsed from there in chunks and inserted in executemany batches, one
+transaction per batch, so the import's own memory stays flat regardless of
+the file size. Runs on the sync engine; the API calls it from a worker thread.
+"""
+import codecs
+import csv
+import io
+import re
+from datetime import date, datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.categoria import Categoria
+from app.models.gasto import Gasto
+from app.models.grupo import Grupo
+from app.services import analytics, rollup
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+READ_CHUNK_SIZE = 64 * 1024
+# An OFX transaction still open after this many characters is rejected, so a
+# missing </STMTTRN> cannot make the parser hold the rest of the file
+MAX_OFX_TRANSACTION_SIZE = 64 * 1024
+
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y")
+OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_TRANSACTION_START = "<STMTTRN>"
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+class ImportRowError(ValueError):
+    """A row that cannot be turned into a gasto"""
+
+class ImportResult:
+    """Counters and (capped) per-row error report of an import"""
+
+    def __init__(self):
+        self.importados = 0
+        self.rejeitados = 0
+        self.erros: List[dict] = []
+
+    def reject(self, linha: int, erro: str) -> None:
+        self.rejeitados += 1
+        if len(self.erros) < MAX_REPORTED_ERRORS:
+            self.erros.append({"linha": linha, "erro": erro})
+
+def parse_valor(raw: str) -> float:
+    """Parse '1234.56', '1.234,56' or 'R$ -12,30' into a float"""
+    text = raw.strip().replace("R$", "").replace(" ", "")
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        raise ImportRowError(f"Valor inválido: {raw!r}")
+
+def parse_data(raw: str) -> date:
+    text = raw.strip()
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"Data inválida: {raw!r}")
+
+def iter_csv(file: BinaryIO) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield (line number, row) from a CSV with a header row.
+    Expected columns: data, valor, descricao, categoria, grupo (the last three optional).
+    Both ',' and ';' delimiters are accepted.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    header = text.readline()
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    fields = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter), [])]
+    reader = csv.DictReader(text, fieldnames=fields, delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num + 1, row
+
+def iter_ofx(file: BinaryIO) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield (transaction number, row) from an OFX statement, reading it in chunks.
+    Debits become gastos with a positive valor; credits are rejected. Between
+    chunks only the unfinished transaction (or the few characters that could
+    begin one) is kept; an oversized one is yielded as a row with an `erro`.
+    """
+    head = file.read(READ_CHUNK_SIZE)
+    encoding = "cp1252" if re.search(rb"CHARSET:\s*1252", head[:1024]) else "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    buffer = decoder.decode(head)
+    numero = 0
+    while True:
+        last_end = 0
+        for match in OFX_TRANSACTION.finditer(buffer):
+            numero += 1
+            fields = {tag.upper(): value.strip() for tag, value in OFX_FIELD.findall(match.group(1))}
+            yield numero, {
+                "data": fields.get("DTPOSTED", "")[:8],
+                "valor": fields.get("TRNAMT", ""),
+                "descricao": fields.get("MEMO") or fields.get("NAME"),
+            }
+            last_end = match.end()
+        buffer = buffer[last_end:]
+
+        start = buffer.upper().rfind(OFX_TRANSACTION_START)
+        if start < 0:
+            buffer = buffer[len(buffer) - len(OFX_TRANSACTION_START) + 1:]
+        elif len(buffer) - start > MAX_OFX_TRANSACTION_SIZE:
+            numero += 1
+            yield numero, {"erro": "Transação sem </STMTTRN> ou grande demais"}
+            buffer = ""
+        else:
+            buffer = buffer[start:]
+
+        chunk = file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+
+def _lookup(db: Session, model, tenant_id: str) -> Dict[str, str]:
+    """nome (case-insensitive) -> id for a tenant's categorias or grupos"""
+    rows = db.query(model.nome, model.id).filter(model.tenant_id == tenant_id).all()
+    return {nome.strip().lower(): row_id for nome, row_id in rows}
+
+def _resolve(names: Dict[str, str], raw: Optional[str], not_found: str) -> Optional[str]:
+    if not raw or not raw.strip():
+        return None
+    try:
+        return names[raw.strip().lower()]
+    except KeyError:
+        raise ImportRowError(f"{not_found}: {raw.strip()!r}")
+
+def _flush(db: Session, batch: List[dict]) -> None:
+    """Insert one batch and its rollup deltas in a single transaction"""
+    analytics.bump_version(db, batch[0]["tenant_id"])
+    db.execute(insert(Gasto), batch)
+    rollup.add_many(db, batch[0]["tenant_id"], (
+        (row["data"], row["categoria_id"], row["grupo_id"], row["valor"], 1)
+        for row in batch
+    ))
+    db.commit()
+
+def import_file(
+    session_factory: sessionmaker,
+    file: BinaryIO,
+    formato: str,
+    tenant_id: str,
+    user_id: str
+) -> ImportResult:
+    """Parse `file` as csv or ofx and insert its rows as gastos of the tenant"""
+    rows = iter_ofx(file) if formato == "ofx" else iter_csv(file)
+    result = ImportResult()
+
+    db = session_factory()
+    try:
+        categorias = _lookup(db, Categoria, tenant_id)
+        grupos = _lookup(db, Grupo, tenant_id)
+
+        batch: List[dict] = []
+        for linha, row in rows:
+            try:
+                if row.get("erro"):
+                    raise ImportRowError(row["erro"])
+                valor = parse_valor(row.get("valor") or "")
+                if formato == "ofx":
+                    if valor >= 0:
+                        raise ImportRowError("Lançamento de crédito ignorado")
+                    valor = -valor
+                    data = datetime.strptime(row["data"], "%Y%m%d").date() if row["data"] else None
+                    if data is None:
+                        raise ImportRowError("Data ausente")
+                else:
+                    data = parse_data(row.get("data") or "")
+                batch.append({
+                    "tenant_id": tenant_id,
+                    "user_id": user_id,
+                    "valor": valor,
+                    "data": data,
+                    "descricao": (row.get("descricao") or "").strip() or None,
+                    "categoria_id": _resolve(categorias, row.get("categoria"), "Categoria não encontrada"),
+                    "grupo_id": _resolve(grupos, row.get("grupo"), "Grupo não encontrado"),
+                })
+            except (ImportRowError, ValueError) as e:
+                result.reject(linha, str(e))
+                continue
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _flush(db, batch)
+                result.importados += len(batch)
+                batch = []
+
+        if batch:
+            _flush(db, batch)
+            result.importados += len(batch)
+    finally:
+        db.close()
+
+    return result
@@ -0,0 +1,391 @@
+"""
+Background jobs queued in the database
+
+Heavy work (exports, rollup rebuilds, tenant and grupo purges) is stored as
+a row in `jobs` and run by a JobWorker: threads inside every API process
+(JOB_WORKER_THREADS) and/or `python -m app.cli.jobs worker`. Workers claim
+jobs with a conditional UPDATE, so any number of them can share the queue
+with nothing but the database. At most JOB_TENANT_CONCURRENCY jobs of one
+tenant run at a time: the UPDATE re-counts the tenant's running jobs, which
+SQLite's single writer makes atomic; on Postgres claimers of the same tenant
+are serialized by a transaction-level advisory lock and candidate rows are
+taken FOR UPDATE SKIP LOCKED.
+
+A failing job is retried up to its max_attempts with an exponential delay.
+A running job whose worker stops refreshing it for JOB_LEASE_SECONDS (the
+process died) goes back to the queue, or fails once out of attempts.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, sessionmaker
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import Job, JobStatusEnum
+from app.services import purge, rollup
+from app.services.gastos import EXPORT_BATCH_SIZE, filter_gastos, gasto_response_select
+from app.services.analytics import analytics_cache
+from app.services.exporter import EXPORT_FORMATS
+
+logger = logging.getLogger("app.jobs")
+
+# How many pending jobs a worker looks at when picking one a tenant may run
+CLAIM_CANDIDATES = 50
+# First key of the Postgres advisory locks taken per tenant while claiming
+CLAIM_LOCK_CLASS = 7301
+
+class JobRun(NamedTuple):
+    """What a handler gets to know about the job it runs"""
+    id: str
+    tipo: str
+    tenant_id: Optional[str]
+    user_id: Optional[str]
+    params: dict
+
+Handler = Callable[[sessionmaker, JobRun], dict]
+
+HANDLERS: Dict[str, Handler] = {}
+
+def handler(tipo: str, max_attempts: Optional[int] = None):
+    """Register a job type; the handler returns the job's JSON result"""
+    def register(fn: Handler) -> Handler:
+        fn.max_attempts = max_attempts
+        HANDLERS[tipo] = fn
+        return fn
+    return register
+
+async def enqueue(
+    db: AsyncSession,
+    tipo: str,
+    tenant_id: Optional[str],
+    user_id: Optional[str] = None,
+    params: Optional[dict] = None
+) -> Job:
+    """Add a job to the session; it is queued when the caller commits"""
+    job = Job(
+        tipo=tipo,
+        tenant_id=tenant_id,
+        user_id=user_id,
+        params=params or {},
+        status=JobStatusEnum.pending,
+        attempts=0,
+        max_attempts=HANDLERS[tipo].max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+async def queue(
+    db: AsyncSession,
+    tipo: str,
+    tenant_id: Optional[str],
+    user_id: Optional[str] = None,
+    params: Optional[dict] = None
+) -> Job:
+    """Enqueue a job, commit and wake this process's worker"""
+    job = await enqueue(db, tipo, tenant_id, user_id, params)
+    await db.commit()
+    job_worker.notify()
+    return job
+
+def claim(db: Session, worker_id: str) -> Optional[JobRun]:
+    """Take the oldest runnable job whose tenant is under its concurrency limit"""
+    now = datetime.utcnow()
+    running = Counter(dict(db.execute(
+        select(Job.tenant_id, func.count()).where(Job.status == JobStatusEnum.running).group_by(Job.tenant_id)
+    ).all()))
+    candidates = db.execute(
+        select(Job.id, Job.tenant_id)
+        .where(Job.status == JobStatusEnum.pending, Job.run_after <= now)
+        .order_by(Job.run_after, Job.created_at)
+        .limit(CLAIM_CANDIDATES)
+    ).all()
+
+    postgres = db.get_bind().dialect.name == "postgresql"
+    for job_id, tenant_id in candidates:
+        if tenant_id is not None and running[tenant_id] >= settings.JOB_TENANT_CONCURRENCY:
+            continue
+        if tenant_id is not None and postgres:
+            # Held until commit/rollback, so the count below sees every committed claim of the tenant
+            db.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_CLASS, func.hashtext(tenant_id))))
+        locked = db.execute(
+            select(Job.id).where(Job.id == job_id, Job.status == JobStatusEnum.pending)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if locked is None:
+            db.rollback()
+            continue
+        conditions = [Job.id == job_id, Job.status == JobStatusEnum.pending]
+        if tenant_id is not None:
+            # Checked again in the UPDATE, in case another worker claimed a job of the tenant meanwhile
+            other = aliased(Job)
+            conditions.append(select(func.count()).select_from(other).where(
+                other.tenant_id == tenant_id, other.status == JobStatusEnum.running
+            ).scalar_subquery() < settings.JOB_TENANT_CONCURRENCY)
+        claimed = db.execute(
+            update(Job)
+            .where(*conditions)
+            .values(
+                status=JobStatusEnum.running,
+                attempts=Job.attempts + 1,
+                locked_by=worker_id,
+                locked_at=now,
+                started_at=now,
+                error=None,
+            )
+        ).rowcount
+        db.commit()
+        if claimed:
+            job = db.get(Job, job_id)
+            return JobRun(job.id, job.tipo, job.tenant_id, job.user_id, job.params or {})
+    db.rollback()
+    return None
+
+def finish(db: Session, job_id: str, worker_id: str, result: dict) -> bool:
+    """
+    Mark a job done. Returns False, changing nothing, when the worker no longer
+    owns it (its lease expired and the job was requeued or claimed again).
+    """
+    owned = db.execute(update(Job).where(
+        Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatusEnum.running
+    ).values(
+        status=JobStatusEnum.done, result=result, locked_by=None, locked_at=None, finished_at=datetime.utcnow()
+    )).rowcount
+    db.commit()
+    return bool(owned)
+
+def fail(db: Session, job_id: str, worker_id: str, error: str) -> bool:
+    """
+    Schedule a retry with exponential delay, or mark the job failed when out of
+    attempts. Returns False, changing nothing, when the worker no longer owns it.
+    """
+    job = db.execute(
+        select(Job).where(Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatusEnum.running)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if job is None:
+        db.rollback()
+        return False
+    now = datetime.utcnow()
+    job.error = error
+    job.locked_by = None
+    job.locked_at = None
+    if job.attempts < job.max_attempts:
+        job.status = JobStatusEnum.pending
+        job.run_after = now + timedelta(seconds=settings.JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1))
+    else:
+        job.status = JobStatusEnum.failed
+        job.finished_at = now
+    db.commit()
+    return True
+
+def recover_expired(db: Session) -> int:
+    """Requeue (or fail) running jobs whose worker stopped refreshing them"""
+    now = datetime.utcnow()
+    expired = Job.status == JobStatusEnum.running, Job.locked_at < now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    common = {"locked_by": None, "locked_at": None, "error": "Worker lost (lease expired)"}
+    failed = db.execute(
+        update(Job).where(*expired, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatusEnum.failed, finished_at=now, **common)
+    ).rowcount
+    requeued = db.execute(
+        update(Job).where(*expired).values(status=JobStatusEnum.pending, run_after=now, **common)
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+def heartbeat(db: Session, worker_id: str, job_ids) -> None:
+    """Refresh the lease of the jobs this worker is running"""
+    if job_ids:
+        db.execute(
+            update(Job).where(Job.id.in_(job_ids), Job.locked_by == worker_id)
+            .values(locked_at=datetime.utcnow())
+        )
+        db.commit()
+
+class JobWorker:
+    """Polls the queue and runs jobs on a pool of threads"""
+
+    def __init__(self, session_factory: sessionmaker, threads: int, name: Optional[str] = None):
+        self.session_factory = session_factory
+        self.threads = threads
+        self.name = name
+        self.worker_id = name
+        self._running: Dict[str, JobRun] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self.run_forever, name="job-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop claiming; running jobs finish (or are recovered after the lease by another worker)"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def notify(self) -> None:
+        """Check the queue now instead of at the next poll"""
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        # Named here, not at import: with gunicorn preload the app is imported in the master
+        self.worker_id = self.name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="job")
+        last_maintenance = datetime.min
+        while not self._stop.is_set():
+            try:
+                if datetime.utcnow() - last_maintenance > timedelta(seconds=settings.JOB_LEASE_SECONDS / 3):
+                    self._maintain()
+                    last_maintenance = datetime.utcnow()
+                self._fill()
+            except Exception:
+                logger.exception("Job worker poll failed")
+            self._wake.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+            self._wake.clear()
+
+    def _maintain(self) -> None:
+        db = self.session_factory()
+        try:
+            with self._lock:
+                job_ids = list(self._running)
+            heartbeat(db, self.worker_id, job_ids)
+            recovered = recover_expired(db)
+            if recovered:
+                logger.warning("Recovered %d jobs from lost workers", recovered)
+        finally:
+            db.close()
+
+    def _fill(self) -> None:
+        """Claim jobs while threads are free"""
+        while not self._stop.is_set():
+            with self._lock:
+                if len(self._running) >= self.threads:
+                    return
+            db = self.session_factory()
+            try:
+                job = claim(db, self.worker_id)
+            finally:
+                db.close()
+            if job is None:
+                return
+            with self._lock:
+                self._running[job.id] = job
+            self._pool.submit(self._execute, job)
+
+    def _execute(self, job: JobRun) -> None:
+        db = self.session_factory()
+        try:
+            fn = HANDLERS.get(job.tipo)
+            if fn is None:
+                raise LookupError(f"Unknown job type {job.tipo!r}")
+            result = fn(self.session_factory, job)
+            if not finish(db, job.id, self.worker_id, result or {}):
+                logger.warning("Job %s (%s) finished after losing its lease; result dropped", job.id, job.tipo)
+        except Exception:
+            logger.exception("Job %s (%s) failed", job.id, job.tipo)
+            db.rollback()
+            if not fail(db, job.id, self.worker_id, traceback.format_exc(limit=5)):
+                logger.warning("Job %s (%s) failed after losing its lease", job.id, job.tipo)
+        finally:
+            db.close()
+            with self._lock:
+                self._running.pop(job.id, None)
+            self._wake.set()
+
+def prune(db: Session, older_than: timedelta) -> int:
+    """Delete finished jobs (and their export files) older than `older_than`"""
+    finished = db.execute(
+        select(Job.id, Job.tipo, Job.result).where(
+            Job.status.in_([JobStatusEnum.done, JobStatusEnum.failed]),
+            Job.finished_at < datetime.utcnow() - older_than
+        )
+    ).all()
+    for job_id, tipo, result in finished:
+        if tipo == "export" and result:
+            export_path(job_id, result["format"]).unlink(missing_ok=True)
+    ids = [job_id for job_id, _, _ in finished]
+    for start in range(0, len(ids), 500):
+        db.execute(delete(Job).where(Job.id.in_(ids[start:start + 500])))
+    db.commit()
+    return len(ids)
+
+# Started by the app's lifespan when JOB_WORKER_THREADS > 0
+job_worker = JobWorker(SessionLocal, max(settings.JOB_WORKER_THREADS, 1))
+
+def export_path(job_id: str, formato: str) -> Path:
+    return Path(settings.JOB_RESULT_DIR) / f"{job_id}.{EXPORT_FORMATS[formato].extension}"
+
+@handler("export")
+def run_export(session_factory: sessionmaker, job: JobRun) -> dict:
+    """Write a gasto export to JOB_RESULT_DIR, for download from /jobs/{id}/download"""
+    params = dict(job.params)
+    formato = params.pop("format", "csv")
+    for field in ("data_inicio", "data_fim"):
+        if params.get(field):
+            params[field] = date.fromisoformat(params[field])
+    encode = EXPORT_FORMATS[formato].encode
+
+    target = export_path(job.id, formato)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_suffix(".tmp")
+    rows = 0
+    db = session_factory()
+    try:
+        query = filter_gastos(gasto_response_select(), job.tenant_id, **params)
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        with partial.open("w", encoding="utf-8", newline="") as output:
+            first = True
+            for batch in result.partitions():
+                output.write(encode(batch, first))
+                rows += len(batch)
+                first = False
+            if first and formato == "csv":
+                output.write(encode([], True))
+    finally:
+        db.close()
+    partial.replace(target)
+    return {"format": formato, "rows": rows, "bytes": target.stat().st_size}
+
+@handler("rollup_rebuild")
+def run_rollup_rebuild(session_factory: sessionmaker, job: JobRun) -> dict:
+    db = session_factory()
+    try:
+        buckets = rollup.rebuild(db, job.tenant_id)
+    finally:
+        db.close()
+    if job.tenant_id:
+        analytics_cache.invalidate(job.tenant_id)
+    return {"buckets": buckets}
+
+@handler("purge_tenant")
+def run_purge_tenant(session_factory: sessionmaker, job: JobRun) -> dict:
+    deleted = purge.purge_tenant(session_factory, job.tenant_id)
+    analytics_cache.invalidate(job.tenant_id)
+    return {"gastos": deleted}
+
+@handler("purge_grupo")
+def run_purge_grupo(session_factory: sessionmaker, job: JobRun) -> dict:
+    deleted = purge.purge_grupo(session_factory, job.tenant_id, job.params["grupo_id"])
+    analytics_cache.invalidate(job.tenant_id)
+    return {"gastos": deleted}
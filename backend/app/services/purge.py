@@ -0,0 +1,110 @@
+"""
+Chunked deletion of tenants and grupos
+
+Gastos are deleted PURGE_CHUNK_SIZE rows per transaction, with a pause of
+PURGE_PAUSE_MS between chunks, so purging a huge tenant never holds the write
+lock (or a long transaction on Postgres) for more than one chunk. Everything
+else hanging off a tenant is removed by the ON DELETE CASCADE foreign keys
+when the tenant row goes.
+
+Purges are idempotent: one that was interrupted is finished by running it
+again (see app.cli.purge).
+"""
+import time
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.models.gasto import Gasto
+from app.models.grupo import Grupo
+from app.models.tenant import Tenant, TenantUser
+from app.services import analytics, rollup
+
+def count_gastos(db: Session, tenant_id: str, grupo_id: Optional[str] = None) -> int:
+    query = select(func.count()).select_from(Gasto).where(Gasto.tenant_id == tenant_id)
+    if grupo_id is not None:
+        query = query.where(Gasto.grupo_id == grupo_id)
+    return db.execute(query).scalar_one()
+
+def delete_gastos(
+    db: Session,
+    tenant_id: str,
+    grupo_id: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    pause: Optional[float] = None
+) -> int:
+    """
+    Delete a tenant's (or one of its grupos') gastos, one committed chunk at a
+    time. For a grupo, each chunk leaves the rollup (and bumps the analytics
+    version) in the same transaction, so the grupo's remaining gastos always
+    have their buckets; a tenant's rollup goes with the tenant row instead.
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    pause = settings.PURGE_PAUSE_MS / 1000 if pause is None else pause
+    chunk = select(Gasto.id, Gasto.data, Gasto.categoria_id, Gasto.grupo_id, Gasto.valor).where(Gasto.tenant_id == tenant_id)
+    if grupo_id is not None:
+        chunk = chunk.where(Gasto.grupo_id == grupo_id)
+    chunk = chunk.limit(chunk_size)
+
+    deleted = 0
+    while True:
+        rows = db.execute(chunk).all()
+        if not rows:
+            return deleted
+        ids = [row.id for row in rows]
+        if grupo_id is not None:
+            analytics.bump_version(db, tenant_id)
+            rollup.add_many(db, tenant_id, (
+                (row.data, row.categoria_id, row.grupo_id, -row.valor, -1) for row in rows
+            ))
+        db.execute(delete(Gasto).where(Gasto.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
+def delete_grupo(db: Session, tenant_id: str, grupo_id: str) -> None:
+    """Delete a grupo and its gastos in one statement each (small grupos). Does not commit."""
+    analytics.bump_version(db, tenant_id)
+    db.execute(
+        delete(Gasto).where(Gasto.tenant_id == tenant_id, Gasto.grupo_id == grupo_id)
+        .execution_options(synchronize_session=False)
+    )
+    rollup.drop_grupo(db, tenant_id, grupo_id)
+    db.execute(delete(Grupo).where(Grupo.id == grupo_id, Grupo.tenant_id == tenant_id))
+
+def purge_grupo(session_factory: sessionmaker, tenant_id: str, grupo_id: str) -> int:
+    """
+    Delete a grupo and its gastos in chunks, taking each chunk out of the
+    rollup as it goes. Returns the number of gastos deleted.
+    """
+    db = session_factory()
+    try:
+        deleted = delete_gastos(db, tenant_id, grupo_id)
+        # Again, for gastos added to the grupo while it was being purged
+        delete_grupo(db, tenant_id, grupo_id)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+def revoke_access(db: Session, tenant_id: str) -> None:
+    """Remove every membership, so nobody can reach the tenant while it is purged. Does not commit."""
+    db.execute(delete(TenantUser).where(TenantUser.tenant_id == tenant_id))
+
+def purge_tenant(session_factory: sessionmaker, tenant_id: str) -> int:
+    """
+    Delete a tenant: memberships first, then its gastos in chunks, then the
+    tenant row (grupos, categorias and rollup cascade). Returns the number of
+    gastos deleted.
+    """
+    db = session_factory()
+    try:
+        revoke_access(db, tenant_id)
+        db.commit()
+        deleted = delete_gastos(db, tenant_id)
+        db.execute(delete(Tenant).where(Tenant.id == tenant_id))
+        db.commit()
+        return deleted
+    finally:
+        db.close()
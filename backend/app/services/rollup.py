@@ -0,0 +1,260 @@
+"""
+Monthly rollup maintenance for dashboard reads
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.gasto import Gasto
+from app.models.resumo import BUCKET_KEY, ResumoMensal
+from app.models.tenant import Tenant
+from app.services import analytics
+
+# Tolerance when comparing float totals against the raw data
+CHECK_TOLERANCE = 0.005
+
+# Gasto fields that decide its bucket (or its amount in it)
+BUCKET_FIELDS = ("grupo_id", "categoria_id", "valor", "data")
+
+# Session.info key of the buckets to recompute before the session commits
+STALE_BUCKETS = "rollup_stale_buckets"
+
+ResumoKey = Tuple[str, str, Optional[str], Optional[str]]
+
+logger = logging.getLogger("app.rollup")
+
+def month_key(day: date) -> str:
+    """YYYY-MM bucket of a date"""
+    return f"{day.year:04d}-{day.month:02d}"
+
+def _key_filter(query, tenant_id: str, ano_mes: str, categoria_id: Optional[str], grupo_id: Optional[str]):
+    """Filter ResumoMensal rows by their natural key, through the unique bucket index"""
+    return query.filter(*(
+        column == value for column, value in zip(BUCKET_KEY, (tenant_id, ano_mes, categoria_id or "", grupo_id or ""))
+    ))
+
+def _month_range(ano_mes: str) -> Tuple[date, date]:
+    """First day of a YYYY-MM bucket and of the month after it"""
+    year, month = (int(part) for part in ano_mes.split("-"))
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+def _upsert(db: Session, tenant_id: str, ano_mes: str, categoria_id: Optional[str], grupo_id: Optional[str],
+            valor: float, quantidade: int, replace: bool = False) -> None:
+    """
+    INSERT ... ON CONFLICT DO UPDATE on the bucket key, so concurrent first
+    writes add up. With `replace` the bucket is set to the given values instead.
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    now = datetime.utcnow()
+    statement = dialect.insert(ResumoMensal).values(
+        id=str(uuid.uuid4()),
+        tenant_id=tenant_id,
+        ano_mes=ano_mes,
+        categoria_id=categoria_id,
+        grupo_id=grupo_id,
+        total=valor,
+        quantidade=quantidade,
+        updated_at=now
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=list(BUCKET_KEY),
+        set_={
+            "total": statement.excluded.total if replace else ResumoMensal.total + statement.excluded.total,
+            "quantidade": (
+                statement.excluded.quantidade if replace
+                else ResumoMensal.quantidade + statement.excluded.quantidade
+            ),
+            "updated_at": now,
+        }
+    ))
+
+def add_to_resumo(
+    db: Session,
+    tenant_id: str,
+    ano_mes: str,
+    categoria_id: Optional[str],
+    grupo_id: Optional[str],
+    valor: float,
+    quantidade: int
+) -> None:
+    """
+    Add a delta to one rollup bucket. Does not commit.
+    Deltas that add gastos create the bucket when missing. The others need it
+    to exist: a missing bucket means the rollup is out of sync, so it is logged
+    and recomputed from the gastos before the session commits.
+    """
+    if quantidade > 0:
+        _upsert(db, tenant_id, ano_mes, categoria_id, grupo_id, valor, quantidade)
+        return
+
+    query = _key_filter(db.query(ResumoMensal), tenant_id, ano_mes, categoria_id, grupo_id)
+    updated = query.update({
+        ResumoMensal.total: ResumoMensal.total + valor,
+        ResumoMensal.quantidade: ResumoMensal.quantidade + quantidade
+    }, synchronize_session=False)
+    if not updated:
+        logger.warning(
+            "Rollup bucket %s %s %s %s missing; recomputing it from the gastos",
+            tenant_id, ano_mes, categoria_id, grupo_id
+        )
+        db.info.setdefault(STALE_BUCKETS, set()).add((tenant_id, ano_mes, categoria_id, grupo_id))
+        return
+    if quantidade < 0:
+        query.filter(ResumoMensal.quantidade <= 0).delete(synchronize_session=False)
+
+def repair_bucket(db: Session, tenant_id: str, ano_mes: str, categoria_id: Optional[str], grupo_id: Optional[str]) -> None:
+    """Set one bucket to the aggregate of its gastos, deleting it when it has none. Does not commit."""
+    inicio, fim = _month_range(ano_mes)
+    total, quantidade = db.query(func.coalesce(func.sum(Gasto.valor), 0.0), func.count(Gasto.id)).filter(
+        Gasto.tenant_id == tenant_id,
+        Gasto.data >= inicio,
+        Gasto.data < fim,
+        Gasto.categoria_id == categoria_id if categoria_id else Gasto.categoria_id.is_(None),
+        Gasto.grupo_id == grupo_id if grupo_id else Gasto.grupo_id.is_(None)
+    ).one()
+    if quantidade:
+        _upsert(db, tenant_id, ano_mes, categoria_id, grupo_id, total, quantidade, replace=True)
+    else:
+        _key_filter(db.query(ResumoMensal), tenant_id, ano_mes, categoria_id, grupo_id).delete(synchronize_session=False)
+
+@event.listens_for(Session, "before_commit")
+def _repair_stale_buckets(db: Session) -> None:
+    """Recompute the buckets add_to_resumo found missing, once the gasto writes are flushed"""
+    stale = db.info.pop(STALE_BUCKETS, None)
+    if stale:
+        db.flush()
+        for key in stale:
+            repair_bucket(db, *key)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_buckets(db: Session) -> None:
+    """Nothing written in a rolled back transaction needs repairing"""
+    db.info.pop(STALE_BUCKETS, None)
+
+def add_gasto(db: Session, gasto: Gasto) -> None:
+    """Account for a new gasto"""
+    add_to_resumo(db, gasto.tenant_id, month_key(gasto.data), gasto.categoria_id, gasto.grupo_id, gasto.valor, 1)
+
+def remove_gasto(db: Session, gasto: Gasto) -> None:
+    """Account for a deleted gasto"""
+    add_to_resumo(db, gasto.tenant_id, month_key(gasto.data), gasto.categoria_id, gasto.grupo_id, -gasto.valor, -1)
+
+def add_many(
+    db: Session,
+    tenant_id: str,
+    deltas: Iterable[Tuple[date, Optional[str], Optional[str], float, int]]
+) -> None:
+    """
+    Apply many (data, categoria_id, grupo_id, valor, quantidade) deltas,
+    issuing one statement per touched bucket. Does not commit.
+    """
+    buckets = defaultdict(lambda: [0.0, 0])
+    for data, categoria_id, grupo_id, valor, quantidade in deltas:
+        bucket = buckets[(month_key(data), categoria_id, grupo_id)]
+        bucket[0] += valor
+        bucket[1] += quantidade
+    for (ano_mes, categoria_id, grupo_id), (valor, quantidade) in buckets.items():
+        if quantidade or valor:
+            add_to_resumo(db, tenant_id, ano_mes, categoria_id, grupo_id, valor, quantidade)
+
+def move_categoria_to_null(db: Session, tenant_id: str, categoria_id: str) -> None:
+    """Fold the buckets of a deleted categoria into the uncategorized buckets"""
+    resumos = db.query(ResumoMensal).filter(
+        ResumoMensal.tenant_id == tenant_id,
+        ResumoMensal.categoria_id == categoria_id
+    ).all()
+    for resumo in resumos:
+        add_to_resumo(db, tenant_id, resumo.ano_mes, None, resumo.grupo_id, resumo.total, resumo.quantidade)
+        db.delete(resumo)
+
+def drop_grupo(db: Session, tenant_id: str, grupo_id: str) -> None:
+    """Remove the buckets of a deleted grupo (its gastos are deleted with it)"""
+    db.query(ResumoMensal).filter(
+        ResumoMensal.tenant_id == tenant_id,
+        ResumoMensal.grupo_id == grupo_id
+    ).delete(synchronize_session=False)
+
+def compute_from_gastos(db: Session, tenant_id: Optional[str] = None) -> Dict[ResumoKey, Tuple[float, int]]:
+    """Aggregate the raw gastos into rollup buckets"""
+    query = db.query(
+        Gasto.tenant_id,
+        Gasto.data,
+        Gasto.categoria_id,
+        Gasto.grupo_id,
+        func.sum(Gasto.valor),
+        func.count(Gasto.id)
+    ).group_by(Gasto.tenant_id, Gasto.data, Gasto.categoria_id, Gasto.grupo_id)
+    if tenant_id:
+        query = query.filter(Gasto.tenant_id == tenant_id)
+
+    buckets: Dict[ResumoKey, List] = defaultdict(lambda: [0.0, 0])
+    for row_tenant, data, categoria_id, grupo_id, total, quantidade in query.yield_per(1000):
+        bucket = buckets[(row_tenant, month_key(data), categoria_id, grupo_id)]
+        bucket[0] += total
+        bucket[1] += quantidade
+
+    return {key: (total, quantidade) for key, (total, quantidade) in buckets.items()}
+
+def rebuild(db: Session, tenant_id: Optional[str] = None) -> int:
+    """
+    Recompute the rollup from the raw gastos, one tenant per transaction.
+    Returns the number of buckets written.
+    """
+    if tenant_id is None:
+        return sum(rebuild(db, row_tenant) for row_tenant in db.execute(select(Tenant.id)).scalars().all())
+
+    # Every gasto write bumps the tenant's analytics version first. Bumping it
+    # here takes the same lock (the tenant row on Postgres, the write lock on
+    # SQLite), so no write lands between reading the gastos and replacing the buckets.
+    analytics.bump_version(db, tenant_id)
+    expected = compute_from_gastos(db, tenant_id)
+
+    db.query(ResumoMensal).filter(ResumoMensal.tenant_id == tenant_id).delete(synchronize_session=False)
+
+    db.add_all([
+        ResumoMensal(
+            tenant_id=row_tenant,
+            ano_mes=ano_mes,
+            categoria_id=categoria_id,
+            grupo_id=grupo_id,
+            total=total,
+            quantidade=quantidade
+        )
+        for (row_tenant, ano_mes, categoria_id, grupo_id), (total, quantidade) in expected.items()
+    ])
+    db.commit()
+
+    return len(expected)
+
+def check(db: Session, tenant_id: Optional[str] = None) -> List[dict]:
+    """Compare the rollup against the raw gastos and return the mismatching buckets"""
+    expected = compute_from_gastos(db, tenant_id)
+
+    query = db.query(ResumoMensal)
+    if tenant_id:
+        query = query.filter(ResumoMensal.tenant_id == tenant_id)
+    actual = {
+        (r.tenant_id, r.ano_mes, r.categoria_id, r.grupo_id): (r.total, r.quantidade)
+        for r in query
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: tuple(v or "" for v in k)):
+        esperado = expected.get(key, (0.0, 0))
+        atual = actual.get(key, (0.0, 0))
+        if esperado[1] != atual[1] or abs(esperado[0] - atual[0]) > CHECK_TOLERANCE:
+            row_tenant, ano_mes, categoria_id, grupo_id = key
+            mismatches.append({
+                "tenant_id": row_tenant,
+                "ano_mes": ano_mes,
+                "categoria_id": categoria_id,
+                "grupo_id": grupo_id,
+                "esperado": esperado,
+                "atual": atual
+            })
+
+    return mismatches
@@ -0,0 +1,86 @@
+"""
+Full-text search over gasto descriptions
+
+SQLite keeps an FTS5 table (gastos_fts) in sync through triggers. It stores
+the gasto id as an UNINDEXED column and joins on gastos.id, so VACUUM and
+batch migrations, which renumber the gastos rowids, leave it valid;
+gastos_fts_ids maps each gasto id to its FTS row for the delete and update
+triggers. Batch migrations that recreate gastos drop the triggers: run
+SQLITE_TRIGGERS again at their end. Postgres has a generated tsvector column
+(gastos.descricao_tsv) with a GIN index. Both ignore case and accents and
+match every search term as a prefix (migrations 0003 and 0008).
+"""
+import re
+from typing import List, Tuple
+from sqlalchemy import ColumnElement, Select, column, func, literal_column, table, text
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "gastos_fts"
+FTS_IDS_TABLE = "gastos_fts_ids"
+TSVECTOR_COLUMN = "descricao_tsv"
+TSVECTOR_INDEX = "ix_gastos_descricao_tsv"
+TS_CONFIG = "public.portuguese_unaccent"
+MAX_TERMS = 8
+
+TERM = re.compile(r"\w+")
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS gastos_fts_insert AFTER INSERT ON gastos BEGIN
+        INSERT INTO gastos_fts(gasto_id, descricao) VALUES (new.id, new.descricao);
+        INSERT INTO gastos_fts_ids(gasto_id, fts_rowid) VALUES (new.id, last_insert_rowid());
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS gastos_fts_delete AFTER DELETE ON gastos BEGIN
+        DELETE FROM gastos_fts WHERE rowid = (SELECT fts_rowid FROM gastos_fts_ids WHERE gasto_id = old.id);
+        DELETE FROM gastos_fts_ids WHERE gasto_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS gastos_fts_update AFTER UPDATE OF descricao ON gastos BEGIN
+        UPDATE gastos_fts SET descricao = new.descricao
+        WHERE rowid = (SELECT fts_rowid FROM gastos_fts_ids WHERE gasto_id = new.id);
+    END
+    """,
+]
+
+def parse_terms(q: str) -> List[str]:
+    """Words of a search string; punctuation and query operators are dropped"""
+    return TERM.findall(q.lower())[:MAX_TERMS]
+
+def apply_search(query: Select, dialect: str, terms: List[str]) -> Tuple[Select, ColumnElement]:
+    """
+    Restrict a gastos query to rows matching every term (as a prefix).
+    Returns the query and a rank expression where lower is a better match.
+    """
+    if dialect == "sqlite":
+        fts = table(FTS_TABLE, column("gasto_id"))
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = query.join(fts, fts.c.gasto_id == literal_column("gastos.id")).where(
+            literal_column(FTS_TABLE).match(match)
+        )
+        return query, func.bm25(literal_column(FTS_TABLE))
+
+    tsvector = literal_column(f"gastos.{TSVECTOR_COLUMN}")
+    tsquery = func.to_tsquery(
+        literal_column(f"'{TS_CONFIG}'::regconfig"),
+        " & ".join(f"{term}:*" for term in terms)
+    )
+    query = query.where(tsvector.op("@@")(tsquery))
+    return query, -func.ts_rank(tsvector, tsquery)
+
+def rebuild_index(db: Session) -> None:
+    """
+    Recreate the FTS5 triggers if missing and re-read every description
+    (SQLite only; Postgres is always in sync)
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    for statement in SQLITE_TRIGGERS:
+        db.execute(text(statement))
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    db.execute(text(f"DELETE FROM {FTS_IDS_TABLE}"))
+    db.execute(text(f"INSERT INTO {FTS_TABLE}(gasto_id, descricao) SELECT id, descricao FROM gastos"))
+    db.execute(text(f"INSERT INTO {FTS_IDS_TABLE}(gasto_id, fts_rowid) SELECT gasto_id, rowid FROM {FTS_TABLE}"))
+    db.commit()
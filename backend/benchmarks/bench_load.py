@@ -0,0 +1,212 @@
+"""
+Load harness for every API router
+
+Seeds a synthetic data set (see app.cli.seed), logs in as the owners of the
+first tenants (tenant 0 is the largest) and drives each endpoint in turn
+through the ASGI app with an async HTTP client. Reports p50/p95/p99 latency,
+throughput and SQL queries per request for each scenario.
+
+Usage:
+    python -m benchmarks.bench_load [--tenants 20] [--gastos 50000] [--sessions 8]
+                                    [--requests 200] [--concurrency 16]
+                                    [--only gastos,dashboard] [--output load.json]
+
+Set BENCH_DATABASE_URL and pass --skip-seed to run against an existing database.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List
+from benchmarks.common import latency_summary, migrate, write_results
+
+import httpx
+from sqlalchemy import event, select
+from app.cli import seed
+from app.core.database import SessionLocal, async_engine, async_read_engine, engine
+from app.main import app
+from app.models.tenant import RoleEnum, TenantUser
+from app.models.user import User
+
+class QueryCounter:
+    """Counts statements executed on every engine the app uses"""
+
+    def __init__(self):
+        self.count = 0
+        engines = {id(e): e for e in (engine, async_engine.sync_engine, async_read_engine.sync_engine)}
+        for counted in engines.values():
+            event.listen(counted, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+class Session:
+    """A logged-in owner and ids to exercise its tenant with"""
+
+    def __init__(self, email: str, tenant_id: str):
+        self.email = email
+        self.tenant_id = tenant_id
+        self.headers: Dict[str, str] = {}
+        self.categoria_ids: List[str] = []
+        self.gasto_ids: List[str] = []
+
+def owner_emails(limit: int) -> List[str]:
+    db = SessionLocal()
+    try:
+        return list(db.execute(
+            select(User.email).join(TenantUser, TenantUser.user_id == User.id)
+            .where(TenantUser.role == RoleEnum.owner, User.email.like("seed-%-0@example.com"))
+            .order_by(User.email)
+        ).scalars())[:limit]
+    finally:
+        db.close()
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post("/api/v1/auth/login", json={"email": email, "password": seed.SEED_PASSWORD})
+
+async def open_sessions(client: httpx.AsyncClient, emails: List[str]) -> List[Session]:
+    sessions = []
+    for email in emails:
+        token = (await login(client, email)).json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        tenant_id = (await client.get("/api/v1/tenants", headers=auth)).json()[0]["id"]
+        session = Session(email, tenant_id)
+        session.headers = {**auth, "X-Tenant-ID": tenant_id}
+        session.categoria_ids = [c["id"] for c in (await client.get("/api/v1/categorias", headers=session.headers)).json()]
+        page = await client.get("/api/v1/gastos", params={"limit": 500}, headers=session.headers)
+        session.gasto_ids = [g["id"] for g in page.json()]
+        sessions.append(session)
+    return sessions
+
+Scenario = Callable[[httpx.AsyncClient, Session, int], Awaitable[httpx.Response]]
+
+def scenarios() -> Dict[str, Scenario]:
+    # Same reference day as the seeded data, so runs on different days compare
+    hoje = seed.SEED_TODAY
+    ano_passado = (hoje - timedelta(days=365)).isoformat()
+
+    def novo_gasto(i: int) -> dict:
+        return {"valor": 10 + i % 90, "data": hoje.isoformat(), "descricao": f"Carga {i}"}
+
+    def gasto_id(session: Session, i: int) -> str:
+        return session.gasto_ids[i % len(session.gasto_ids)]
+
+    return {
+        "auth.login": lambda c, s, i: login(c, s.email),
+        "auth.me": lambda c, s, i: c.get("/api/v1/auth/me", headers=s.headers),
+        "tenants.list": lambda c, s, i: c.get("/api/v1/tenants", headers=s.headers),
+        "tenants.users": lambda c, s, i: c.get(f"/api/v1/tenants/{s.tenant_id}/users", headers=s.headers),
+        "grupos.list": lambda c, s, i: c.get("/api/v1/grupos", headers=s.headers),
+        "grupos.create": lambda c, s, i: c.post("/api/v1/grupos", json={"nome": f"Carga {i}"}, headers=s.headers),
+        "categorias.list": lambda c, s, i: c.get("/api/v1/categorias", headers=s.headers),
+        "categorias.create": lambda c, s, i: c.post("/api/v1/categorias", json={"nome": f"Carga {i}"}, headers=s.headers),
+        "gastos.page": lambda c, s, i: c.get("/api/v1/gastos", params={"limit": 50}, headers=s.headers),
+        "gastos.filtered": lambda c, s, i: c.get("/api/v1/gastos", params={
+            "limit": 50,
+            "categoria_id": s.categoria_ids[i % len(s.categoria_ids)] if s.categoria_ids else None,
+            "data_inicio": ano_passado,
+        }, headers=s.headers),
+        "gastos.stream": lambda c, s, i: c.get("/api/v1/gastos", headers=s.headers),
+        "gastos.search": lambda c, s, i: c.get("/api/v1/gastos/search", params={"q": "uber", "limit": 50}, headers=s.headers),
+        "gastos.create": lambda c, s, i: c.post("/api/v1/gastos", json=novo_gasto(i), headers=s.headers),
+        "gastos.update": lambda c, s, i: c.put(f"/api/v1/gastos/{gasto_id(s, i)}", json={"valor": 1 + i % 50}, headers=s.headers),
+        "dashboard.stats": lambda c, s, i: c.get("/api/v1/dashboard/stats", headers=s.headers),
+        "dashboard.query": lambda c, s, i: c.get("/api/v1/dashboard/query", params={"group_by": "categoria,mes"}, headers=s.headers),
+        "dashboard.timeseries": lambda c, s, i: c.get("/api/v1/dashboard/timeseries", params={
+            "from": ano_passado, "granularity": "week", "group_by": "categoria",
+        }, headers=s.headers),
+        # Last: consumes the gasto ids the other scenarios use
+        "gastos.delete": lambda c, s, i: c.delete(f"/api/v1/gastos/{s.gasto_ids.pop()}", headers=s.headers),
+    }
+
+# Expensive scenarios run a fraction of --requests
+REQUEST_SHARE = {"auth.login": 0.1, "gastos.stream": 0.1}
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    sessions: List[Session],
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    counter: QueryCounter
+) -> dict:
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    rotation = itertools.cycle(sessions)
+
+    async def call(i: int, session: Session):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await scenario(client, session, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i, next(rotation)) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 2),
+        "queries_per_request": round((counter.count - queries_before) / requests, 2),
+        "statuses": statuses,
+        **latency_summary(latencies),
+    }
+
+async def run(args) -> dict:
+    counter = QueryCounter()
+    selected = scenarios()
+    if args.only:
+        prefixes = tuple(args.only.split(","))
+        selected = {name: fn for name, fn in selected.items() if name.startswith(prefixes)}
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        sessions = await open_sessions(client, owner_emails(args.sessions))
+        for name, scenario in selected.items():
+            requests = max(1, int(args.requests * REQUEST_SHARE.get(name, 1)))
+            if name == "gastos.delete":
+                requests = min(requests, len(sessions) * min(len(s.gasto_ids) for s in sessions))
+                if not requests:
+                    continue
+            results[name] = await run_scenario(client, sessions, scenario, requests, args.concurrency, counter)
+            r = results[name]
+            print(
+                f"{name:22} {r['requests_per_s']:>9} req/s  p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  "
+                f"p99 {r['p99_ms']:>8} ms  {r['queries_per_request']:>6} q/req  {r['statuses']}"
+            )
+    return results
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--gastos", type=int, default=50000)
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--sessions", type=int, default=8, help="Tenant owners to spread requests over")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", help="Comma-separated scenario prefixes, e.g. gastos,dashboard")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    migrate()
+    if not args.skip_seed:
+        db = SessionLocal()
+        try:
+            print(f"Seeded: {seed.seed(db, tenants=args.tenants, gastos=args.gastos, skew=args.skew)}")
+        finally:
+            db.close()
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "scenarios": asyncio.run(run(args)),
+    }
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Login throughput across password hashing pool sizes
+
+Usage:
+    python -m benchmarks.bench_login [--sizes 0,1,2,4] [--requests 200] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.common import latency_summary, migrate, write_results
+
+import httpx
+from app.core import hashing
+from app.core.database import SessionLocal
+from app.main import app
+from app.models.user import User
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-password"
+
+def create_user() -> None:
+    db = SessionLocal()
+    try:
+        if not db.query(User).filter(User.email == EMAIL).first():
+            db.add(User(nome="Bench", email=EMAIL, password_hash=hashing.pwd_context.hash(PASSWORD)))
+            db.commit()
+    finally:
+        db.close()
+
+async def run(requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(statuses.get(200, 0) / elapsed, 2),
+        "statuses": statuses,
+        **latency_summary(latencies),
+    }
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="0,1,2,4", help="Comma-separated pool sizes (0 = inline)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue-depth", type=int, default=hashing.settings.PASSWORD_HASH_QUEUE_DEPTH)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    migrate()
+    create_user()
+
+    results = {"concurrency": args.concurrency, "queue_depth": args.queue_depth, "runs": {}}
+    for size in (int(s) for s in args.sizes.split(",")):
+        hashing.password_pool = hashing.PasswordPool(workers=size, queue_depth=args.queue_depth)
+        # Warm up the worker processes outside the measurement
+        for _ in range(max(size, 1)):
+            hashing.password_pool.hash(PASSWORD)
+        run_result = asyncio.run(run(args.requests, args.concurrency))
+        hashing.password_pool.shutdown()
+        results["runs"][size] = run_result
+        print(f"pool={size}: {run_result}")
+
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == "__main__":
+    main()
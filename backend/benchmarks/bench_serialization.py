@@ -0,0 +1,103 @@
+"""
+Serialization cost of a gasto list response
+
+Compares, per 10k gastos, the previous path (a GastoResponse per row returned
+through response_model) with the ListSerializer paths (validated once by a
+TypeAdapter, or raw rows through orjson). Each variant is a route on a bare
+FastAPI app called over ASGI, so FastAPI's own response handling is included.
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 20] [--output serialization.json]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import List
+from benchmarks.common import latency_summary, write_results
+
+import httpx
+from fastapi import FastAPI
+from app.core.config import settings
+from app.core.responses import ListSerializer
+from app.schemas.gasto import GastoResponse
+
+def make_rows(count: int) -> List[dict]:
+    """Row mappings shaped like gasto_response_select results"""
+    tenant_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    start = date(2024, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "grupo_id": None,
+            "categoria_id": str(uuid.uuid4()) if i % 3 else None,
+            "valor": round(10 + i * 0.37, 2),
+            "data": start + timedelta(days=i % 700),
+            "descricao": f"gasto de teste número {i}",
+            "created_at": datetime(2024, 1, 1, 12, 0, 0, i % 1000000),
+            "categoria_nome": "Alimentação" if i % 3 else None,
+            "grupo_nome": None,
+            "user_nome": "Bench",
+        }
+        for i in range(count)
+    ]
+
+class Row:
+    """Stand-in for a SQLAlchemy Row"""
+    __slots__ = ("_mapping",)
+
+    def __init__(self, mapping: dict):
+        self._mapping = mapping
+
+def build_app(rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+    wrapped = [Row(row) for row in rows]
+    serializer = ListSerializer(GastoResponse)
+
+    @app.get("/models", response_model=List[GastoResponse])
+    async def models():
+        return [GastoResponse(**row) for row in rows]
+
+    @app.get("/validated", response_model=List[GastoResponse])
+    async def validated():
+        settings.RESPONSE_VALIDATION = True
+        return serializer.response(wrapped)
+
+    @app.get("/orjson", response_model=List[GastoResponse])
+    async def raw():
+        settings.RESPONSE_VALIDATION = False
+        return serializer.response(wrapped)
+
+    return app
+
+async def measure(app: FastAPI, path: str, repeat: int) -> dict:
+    samples = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get(path)  # warm up
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get(path)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {"bytes": len(response.content), **latency_summary(samples)}
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    app = build_app(make_rows(args.rows))
+    results = {"rows": args.rows, "repeat": args.repeat, "variants": {}}
+    for variant in ("models", "validated", "orjson"):
+        results["variants"][variant] = asyncio.run(measure(app, f"/{variant}", args.repeat))
+        print(f"{variant}: {results['variants'][variant]}")
+
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Cold start: app import time and first-request latency
+
+Each run starts a fresh interpreter, imports app.main and sends the first
+requests through the ASGI app, so regressions in import-time work show up.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from benchmarks.common import BACKEND_DIR, migrate, write_results
+
+CHILD = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import httpx
+from app.main import app
+imported = time.perf_counter()
+
+async def first_requests():
+    timings = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name, method, path, body in (
+            ("first_request_ms", "GET", "/health", None),
+            ("second_request_ms", "GET", "/health", None),
+            ("first_db_request_ms", "POST", "/api/v1/auth/login", {"email": "nobody@example.com", "password": "x"}),
+            ("second_db_request_ms", "POST", "/api/v1/auth/login", {"email": "nobody@example.com", "password": "x"}),
+        ):
+            t = time.perf_counter()
+            await client.request(method, path, json=body)
+            timings[name] = (time.perf_counter() - t) * 1000
+    return timings
+
+timings = asyncio.run(first_requests())
+print(json.dumps({"import_ms": (imported - started) * 1000, **timings}))
+"""
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PASSWORD_HASH_WORKERS": "0"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    migrate()
+
+    runs = [run_once() for _ in range(args.runs)]
+    results = {
+        "runs": args.runs,
+        # Median of each measurement across the runs
+        "median": {key: round(sorted(run[key] for run in runs)[len(runs) // 2], 3) for key in runs[0]},
+        "samples": runs,
+    }
+    print(json.dumps(results["median"], indent=2))
+
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Smoke check for the Prometheus endpoint
+
+Sends a few requests through the ASGI app (one without SQL, one with), then
+scrapes /metrics and fails unless it answers 200 with the request and SQL
+series for those routes.
+
+Usage:
+    python -m benchmarks.check_metrics
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import List
+from benchmarks.common import migrate
+
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ["METRICS_ENABLED"] = "true"
+
+import httpx
+from app.main import app
+
+LOGIN = "/api/v1/auth/login"
+EXPECTED = (
+    'http_requests_total{method="GET",route="/health",status="200"}',
+    f'http_requests_total{{method="POST",route="{LOGIN}",status="401"}}',
+    'http_request_duration_seconds_count{method="GET",route="/health"}',
+    'http_response_size_bytes_count{route="/health"}',
+    f'db_queries_per_request_count{{route="{LOGIN}"}}',
+    f'db_time_per_request_seconds_count{{route="{LOGIN}"}}',
+    f'db_queries_total{{route="{LOGIN}"}}',
+)
+
+async def scrape() -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        await client.get("/health")
+        await client.post(LOGIN, json={"email": "nobody@example.com", "password": "x"})
+        return await client.get("/metrics")
+
+def check(response: httpx.Response) -> List[str]:
+    """Problems found in the scrape"""
+    if response.status_code != 200:
+        return [f"/metrics returned {response.status_code}: {response.text[:200]}"]
+    samples = {line.rsplit(" ", 1)[0] for line in response.text.splitlines() if not line.startswith("#")}
+    return [f"missing series {series}" for series in EXPECTED if series not in samples]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args(argv)
+
+    migrate()
+    problems = check(asyncio.run(scrape()))
+    for problem in problems:
+        print(problem)
+    print(f"Metrics check: {'failed' if problems else 'ok'}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Query-plan regression check for tenant-scoped queries
+
+Seeds a small data set, calls the endpoints through the ASGI app while
+capturing every SELECT/UPDATE/DELETE they send, and explains each captured
+statement (EXPLAIN QUERY PLAN on SQLite, EXPLAIN with sequential scans
+disabled on Postgres). Fails when a plan scans all of `gastos` or
+`tenant_users`, when a route in MAX_STATEMENTS sends more statements than
+allowed, or when plans differ from the reviewed snapshot in
+benchmarks/plans/<dialect>.txt.
+
+Every statement gets its own `## route #n` section, repeats included, so an
+N+1 adds sections to the diff; only the EXPLAIN of a repeated statement is
+replaced by a reference to the first one.
+
+Usage:
+    python -m benchmarks.check_plans            # compare with the snapshot
+    python -m benchmarks.check_plans --update   # rewrite the snapshot after review
+
+Set BENCH_DATABASE_URL to check against Postgres.
+"""
+import argparse
+import asyncio
+import difflib
+import itertools
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+from benchmarks.common import migrate
+
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+import httpx
+from sqlalchemy import event
+from app.api.v1.deps import membership_cache
+from app.cli import seed
+from app.core.database import SessionLocal, async_engine, async_read_engine
+from app.core.security import token_cache
+from app.main import app
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / "plans"
+CHECKED_TABLES = ("gastos", "tenant_users")
+FULL_SCAN = {
+    "sqlite": re.compile(rf"^SCAN ({'|'.join(CHECKED_TABLES)})\b"),
+    "postgresql": re.compile(rf"Seq Scan on ({'|'.join(CHECKED_TABLES)})\b"),
+}
+GASTO_FILTERS = ("grupo_id", "categoria_id", "data_inicio", "data_fim", "valor_min", "valor_max", "cursor")
+# Statements per call, counting the user lookup of the token (caches are cleared)
+MAX_STATEMENTS = {
+    "tenants.list": 2,
+    "tenants.users": 2,
+    "tenants.users[role,cursor]": 2,
+}
+
+class StatementCapture:
+    """Records the statements the app sends while `active`"""
+
+    def __init__(self):
+        self.active = False
+        self.statements: List[Tuple[str, object]] = []
+        engines = {id(e): e for e in (async_engine.sync_engine, async_read_engine.sync_engine)}
+        for captured in engines.values():
+            event.listen(captured, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.active and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+async def capture_endpoints(client: httpx.AsyncClient, capture: StatementCapture) -> Dict[str, List[Tuple[str, object]]]:
+    """Call every endpoint once per variant; returns label -> statements"""
+    token = (await client.post("/api/v1/auth/login", json={
+        "email": seed.seed_email(0, 0), "password": seed.SEED_PASSWORD
+    })).json()["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+    tenant_id = (await client.get("/api/v1/tenants", headers=auth)).json()[0]["id"]
+    headers = {**auth, "X-Tenant-ID": tenant_id}
+    categoria_id = (await client.get("/api/v1/categorias", headers=headers)).json()[0]["id"]
+    grupo_id = (await client.get("/api/v1/grupos", headers=headers)).json()[0]["id"]
+    page = await client.get("/api/v1/gastos", params={"limit": 2}, headers=headers)
+    gasto_id = page.json()[0]["id"]
+    members = await client.get(f"/api/v1/tenants/{tenant_id}/users", params={"limit": 1}, headers=headers)
+    values = {
+        "grupo_id": grupo_id,
+        "categoria_id": categoria_id,
+        "data_inicio": "2000-01-01",
+        "data_fim": "2100-01-01",
+        "valor_min": 1,
+        "valor_max": 1000,
+        "cursor": page.headers["X-Next-Cursor"],
+    }
+
+    calls = [
+        ("auth.me", "GET", "/api/v1/auth/me", {}, None),
+        ("tenants.list", "GET", "/api/v1/tenants", {}, None),
+        ("tenants.users", "GET", f"/api/v1/tenants/{tenant_id}/users", {}, None),
+        ("tenants.users[role,cursor]", "GET", f"/api/v1/tenants/{tenant_id}/users",
+         {"role": "member", "limit": 50, "cursor": members.headers["X-Next-Cursor"]}, None),
+        ("categorias.list", "GET", "/api/v1/categorias", {}, None),
+        ("grupos.list", "GET", "/api/v1/grupos", {}, None),
+        ("gastos.search", "GET", "/api/v1/gastos/search", {"q": "uber"}, None),
+        ("gastos.export", "GET", "/api/v1/gastos/export", {"format": "ndjson", "data_inicio": "2000-01-01"}, None),
+        ("gastos.update", "PUT", f"/api/v1/gastos/{gasto_id}", {}, {"valor": 12.5}),
+        ("dashboard.stats", "GET", "/api/v1/dashboard/stats", {}, None),
+        ("dashboard.query", "GET", "/api/v1/dashboard/query", {"group_by": "categoria,mes"}, None),
+        ("dashboard.timeseries[rollup]", "GET", "/api/v1/dashboard/timeseries",
+         {"from": "2020-01-01", "to": "2099-12-31", "group_by": "categoria"}, None),
+        ("dashboard.timeseries[gastos]", "GET", "/api/v1/dashboard/timeseries",
+         {"from": "2025-01-15", "granularity": "week", "group_by": "grupo"}, None),
+    ]
+    # get_gastos with every combination of filters
+    for size in range(len(GASTO_FILTERS) + 1):
+        for combination in itertools.combinations(GASTO_FILTERS, size):
+            params = {"limit": 50, **{name: values[name] for name in combination}}
+            calls.append((f"gastos.list[{','.join(combination)}]", "GET", "/api/v1/gastos", params, None))
+    calls.append(("gastos.delete", "DELETE", f"/api/v1/gastos/{gasto_id}", {}, None))
+
+    captured = {}
+    for label, method, path, params, body in calls:
+        # Drop cached identities so the auth and membership queries run every time
+        token_cache.clear()
+        membership_cache.clear()
+        capture.statements = []
+        capture.active = True
+        response = await client.request(method, path, params=params, json=body, headers=headers)
+        capture.active = False
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label}: {method} {path} returned {response.status_code}: {response.text}")
+        captured[label] = capture.statements
+    return captured
+
+async def explain(statement: str, parameters, dialect: str) -> List[str]:
+    async with async_engine.connect() as conn:
+        if dialect == "sqlite":
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            depth = {0: -1}
+            lines = []
+            for node_id, parent, _, detail in rows:
+                depth[node_id] = depth.get(parent, -1) + 1
+                lines.append("  " * depth[node_id] + detail)
+            return lines
+        # Sequential scans stay in the plan only when no index can serve the query
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        rows = (await conn.exec_driver_sql(f"EXPLAIN (COSTS OFF) {statement}", parameters)).all()
+        await conn.rollback()
+        return [row[0] for row in rows]
+
+async def build_report(dialect: str) -> Tuple[str, List[str]]:
+    """Snapshot text for every captured statement, and the failures found"""
+    capture = StatementCapture()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        captured = await capture_endpoints(client, capture)
+
+    explained: Dict[str, str] = {}
+    sections, failures = [], []
+    for label, statements in captured.items():
+        limit = MAX_STATEMENTS.get(label)
+        if limit is not None and len(statements) > limit:
+            failures.append(f"{label}: {len(statements)} statements, expected at most {limit}")
+        for number, (statement, parameters) in enumerate(statements, start=1):
+            name = f"{label} #{number}"
+            if statement in explained:
+                sections.append(f"## {name}\nsame as {explained[statement]}")
+                continue
+            explained[statement] = name
+            plan = await explain(statement, parameters, dialect)
+            sections.append(f"## {name}\n" + "\n".join(plan))
+            failures += [
+                f"FULL SCAN {name}: {line.strip()}\n    {statement}"
+                for line in plan if FULL_SCAN[dialect].search(line.strip())
+            ]
+    return "\n\n".join(sections) + "\n", failures
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="Write the current plans as the new snapshot")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in BENCH_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    migrate()
+    if not args.skip_seed:
+        db = SessionLocal()
+        try:
+            seed.seed(db, tenants=5, gastos=5000)
+        finally:
+            db.close()
+
+    dialect = async_engine.dialect.name
+    report, failures = asyncio.run(build_report(dialect))
+    for failure in failures:
+        print(failure)
+
+    snapshot = SNAPSHOT_DIR / f"{dialect}.txt"
+    if args.update:
+        SNAPSHOT_DIR.mkdir(exist_ok=True)
+        snapshot.write_text(report)
+        print(f"Snapshot written to {snapshot}")
+        return 1 if failures else 0
+
+    if not snapshot.exists():
+        print(f"No snapshot at {snapshot}; run with --update and review it")
+        return 1
+    diff = list(difflib.unified_diff(
+        snapshot.read_text().splitlines(), report.splitlines(),
+        fromfile=f"{snapshot.name} (snapshot)", tofile=f"{snapshot.name} (current)", lineterm=""
+    ))
+    if diff:
+        print("\n".join(diff))
+        print("Query plans changed; review them and run with --update to accept")
+    print(f"Plan check: {len(failures)} failures, {'changed' if diff else 'unchanged'} plans")
+    return 1 if failures or diff else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
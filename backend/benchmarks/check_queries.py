@@ -0,0 +1,123 @@
+"""
+Query-count regression check for the gasto read paths
+
+Builds two tenants through the API, one with a single gasto and one with
+--rows gastos (with categoria, grupo and user names to join), then counts
+the statements each gasto route sends for both. Fails when a route sends
+more statements for the large tenant than for the small one (an N+1), or
+more than its budget in MAX_STATEMENTS.
+
+Usage:
+    python -m benchmarks.check_queries [--rows 25]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import Dict, List, Tuple
+from benchmarks.common import migrate
+
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+import httpx
+from sqlalchemy import event
+from app.api.v1.deps import membership_cache
+from app.core.database import async_engine, async_read_engine
+from app.core.security import token_cache
+from app.main import app
+
+# Statements per call, counting the user and membership lookups (caches are cleared)
+MAX_STATEMENTS = {
+    "gastos.list[page]": 3,
+    "gastos.list[stream]": 3,
+    "gastos.create": 6,
+    "gastos.update": 9,
+}
+
+class StatementCounter:
+    """Counts the statements the app sends while `active`"""
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+        engines = {id(e): e for e in (async_engine.sync_engine, async_read_engine.sync_engine)}
+        for counted in engines.values():
+            event.listen(counted, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.active:
+            self.count += 1
+
+async def create_tenant(client: httpx.AsyncClient, name: str, rows: int) -> Tuple[dict, str]:
+    """Register a user with its own tenant holding `rows` gastos; returns (headers, a gasto id)"""
+    token = (await client.post("/api/v1/auth/register", json={
+        "full_name": name, "email": f"{name}@example.com", "password": "check-queries", "tenant_name": name
+    })).json()["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+    tenant_id = (await client.get("/api/v1/tenants", headers=auth)).json()[0]["id"]
+    headers = {**auth, "X-Tenant-ID": tenant_id}
+    categoria_id = (await client.post("/api/v1/categorias", json={"nome": "Mercado"}, headers=headers)).json()["id"]
+    grupo_id = (await client.post("/api/v1/grupos", json={"nome": "Casa"}, headers=headers)).json()["id"]
+
+    gasto_id = None
+    for i in range(rows):
+        gasto = (await client.post("/api/v1/gastos", json={
+            "valor": 10 + i,
+            "data": f"2025-01-{i % 28 + 1:02d}",
+            "descricao": f"Gasto {i}",
+            "categoria_id": categoria_id if i % 2 else None,
+            "grupo_id": grupo_id if i % 3 else None,
+        }, headers=headers)).json()
+        gasto_id = gasto["id"]
+    return headers, gasto_id
+
+async def count_calls(client: httpx.AsyncClient, counter: StatementCounter, headers: dict, gasto_id: str) -> Dict[str, int]:
+    """Statements sent by each gasto route for one tenant"""
+    calls = [
+        ("gastos.list[page]", "GET", "/api/v1/gastos", {"limit": 500}, None),
+        ("gastos.list[stream]", "GET", "/api/v1/gastos", {}, None),
+        ("gastos.create", "POST", "/api/v1/gastos", {}, {"valor": 1, "data": "2025-02-01", "descricao": "Novo"}),
+        ("gastos.update", "PUT", f"/api/v1/gastos/{gasto_id}", {}, {"valor": 12.5}),
+    ]
+    counts = {}
+    for label, method, path, params, body in calls:
+        token_cache.clear()
+        membership_cache.clear()
+        counter.count = 0
+        counter.active = True
+        response = await client.request(method, path, params=params, json=body, headers=headers)
+        counter.active = False
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label}: {method} {path} returned {response.status_code}: {response.text}")
+        counts[label] = counter.count
+    return counts
+
+async def measure(rows: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+    counter = StatementCounter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        small = await create_tenant(client, "check-one", 1)
+        large = await create_tenant(client, "check-many", rows)
+        return await count_calls(client, counter, *small), await count_calls(client, counter, *large)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=25, help="Gastos in the large tenant")
+    args = parser.parse_args(argv)
+
+    migrate()
+    one, many = asyncio.run(measure(args.rows))
+
+    failures: List[str] = []
+    for label, budget in MAX_STATEMENTS.items():
+        print(f"{label}: {one[label]} statements with 1 gasto, {many[label]} with {args.rows}")
+        if many[label] != one[label]:
+            failures.append(f"{label}: statement count grows with the rows ({one[label]} -> {many[label]})")
+        if max(one[label], many[label]) > budget:
+            failures.append(f"{label}: {max(one[label], many[label])} statements, expected at most {budget}")
+    for failure in failures:
+        print(failure)
+    print(f"Query check: {len(failures)} failures")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
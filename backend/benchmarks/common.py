@@ -0,0 +1,46 @@
+"""
+Helpers shared by the benchmark scripts
+
+Import this module before anything under `app`: it points DATABASE_URL at a
+scratch SQLite file unless one is already set in the environment.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Sequence
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    _fd, _path = tempfile.mkstemp(prefix="bench-", suffix=".db")
+    os.close(_fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_path}"
+
+def migrate() -> None:
+    """Bring the benchmark database to the latest schema"""
+    from alembic import command
+    from alembic.config import Config
+    command.upgrade(Config(str(BACKEND_DIR / "alembic.ini")), "head")
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def latency_summary(samples_ms: List[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+    }
+
+def write_results(path: str, results: dict) -> None:
+    """Write results as JSON so runs can be compared across commits"""
+    Path(path).write_text(json.dumps(results, indent=2, default=str))
+    print(f"Results written to {path}")
@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration for production
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported once in the master (preload) and workers fork after the
+imports. Every setting can be overridden through the environment.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# Seconds a silent worker may live, and seconds in-flight requests get to finish on shutdown
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers after this many requests (0 = never)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# Workers write their metric samples here and /metrics aggregates them. Set
+# before the app (and prometheus_client) is imported; stale samples from a
+# previous run are dropped.
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc")
+)
+os.makedirs(multiproc_dir, exist_ok=True)
+for stale in glob.glob(os.path.join(multiproc_dir, "*.db")):
+    os.remove(stale)
+
+def on_starting(server):
+    """Check the schema once, before any worker starts"""
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.core.schema import check_schema
+
+    if settings.SCHEMA_CHECK:
+        check_schema(engine)
+    engine.dispose()
+
+def post_fork(server, worker):
+    """Workers must not reuse connections opened by the master"""
+    from app.core.database import async_engine, async_read_engine, engine
+
+    for pooled in (engine, async_engine.sync_engine, async_read_engine.sync_engine):
+        pooled.dispose(close=False)
+
+def child_exit(server, worker):
+    """Drop the live gauges of a dead worker; its counters stay in the totals"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
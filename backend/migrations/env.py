@@ -0,0 +1,54 @@
+"""
+Alembic migration environment
+"""
+from logging.config import fileConfig
+from alembic import context
+from app.core.database import engine, Base
+import app.models  # noqa: F401 - registers every table on Base.metadata
+from app.services.search import FTS_TABLE, TSVECTOR_COLUMN, TSVECTOR_INDEX
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the search index objects of migration 0003 out of autogenerate"""
+    if type_ == "table" and name.startswith(FTS_TABLE):
+        return False
+    return name not in (TSVECTOR_COLUMN, TSVECTOR_INDEX)
+
+def run_migrations_offline():
+    """Emit the migration SQL without a database connection"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run the migrations against the configured database"""
+    with engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # Batch migrations drop and recreate tables; with foreign keys on,
+            # dropping a parent table would cascade into its children
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
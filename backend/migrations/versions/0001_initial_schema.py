@@ -0,0 +1,86 @@
+"""initial schema
+
+Tables as previously created by Base.metadata.create_all. Databases created
+that way should be marked with `alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("nome", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "tenants",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("nome", sa.String(255), nullable=False),
+        sa.Column("plano", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "tenant_users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("tenant_id", sa.String(36), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("role", sa.Enum("owner", "admin", "member", name="roleenum")),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "grupos",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("tenant_id", sa.String(36), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("nome", sa.String(255), nullable=False),
+        sa.Column("tipo", sa.Enum("familia", "viagem", "evento", name="tipogrupoenum")),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "categorias",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("tenant_id", sa.String(36), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("nome", sa.String(255), nullable=False),
+        sa.Column("tipo", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "gastos",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("tenant_id", sa.String(36), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("grupo_id", sa.String(36), sa.ForeignKey("grupos.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("categoria_id", sa.String(36), sa.ForeignKey("categorias.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("valor", sa.Float(), nullable=False),
+        sa.Column("data", sa.Date()),
+        sa.Column("descricao", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table("gastos")
+    op.drop_table("categorias")
+    op.drop_table("grupos")
+    op.drop_table("tenant_users")
+    op.drop_table("tenants")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    sa.Enum(name="tipogrupoenum").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="roleenum").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,64 @@
+"""composite indexes for tenant-scoped queries, and the monthly gastos rollup
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Month bucket and new row id per dialect, for backfilling the rollup
+MONTH = {"postgresql": "to_char(data, 'YYYY-MM')", "sqlite": "strftime('%Y-%m', data)"}
+NEW_ID = {"postgresql": "gen_random_uuid()::text", "sqlite": "lower(hex(randomblob(16)))"}
+
+def upgrade():
+    op.create_table(
+        "resumos_mensais",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("tenant_id", sa.String(36), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ano_mes", sa.String(7), nullable=False),
+        sa.Column("categoria_id", sa.String(36), nullable=True),
+        sa.Column("grupo_id", sa.String(36), nullable=True),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("quantidade", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    # Existing gastos go into the rollup too, or the dashboard starts from zero
+    dialect = op.get_bind().dialect.name
+    op.execute(f"""
+        INSERT INTO resumos_mensais (id, tenant_id, ano_mes, categoria_id, grupo_id, total, quantidade, updated_at)
+        SELECT {NEW_ID[dialect]}, tenant_id, ano_mes, categoria_id, grupo_id, total, quantidade, CURRENT_TIMESTAMP
+        FROM (
+            SELECT tenant_id, {MONTH[dialect]} AS ano_mes, categoria_id, grupo_id,
+                   sum(valor) AS total, count(*) AS quantidade
+            FROM gastos
+            WHERE data IS NOT NULL
+            GROUP BY tenant_id, {MONTH[dialect]}, categoria_id, grupo_id
+        ) buckets
+    """)
+
+    op.create_index("ix_gastos_tenant_data", "gastos", ["tenant_id", "data", "id"])
+    op.create_index("ix_gastos_tenant_categoria", "gastos", ["tenant_id", "categoria_id"])
+    op.create_index("ix_gastos_tenant_grupo", "gastos", ["tenant_id", "grupo_id"])
+    op.create_index("ix_grupos_tenant_id", "grupos", ["tenant_id"])
+    op.create_index("ix_categorias_tenant_id", "categorias", ["tenant_id"])
+    op.create_index("ix_resumos_mensais_chave", "resumos_mensais", ["tenant_id", "ano_mes", "categoria_id", "grupo_id"])
+    op.create_index("ix_tenant_users_user", "tenant_users", ["user_id"])
+    # Fails if duplicate memberships already exist; remove them before upgrading
+    op.create_index("uq_tenant_users_tenant_user", "tenant_users", ["tenant_id", "user_id"], unique=True)
+
+def downgrade():
+    op.drop_index("uq_tenant_users_tenant_user", table_name="tenant_users")
+    op.drop_index("ix_tenant_users_user", table_name="tenant_users")
+    op.drop_index("ix_resumos_mensais_chave", table_name="resumos_mensais")
+    op.drop_index("ix_categorias_tenant_id", table_name="categorias")
+    op.drop_index("ix_grupos_tenant_id", table_name="grupos")
+    op.drop_index("ix_gastos_tenant_grupo", table_name="gastos")
+    op.drop_index("ix_gastos_tenant_categoria", table_name="gastos")
+    op.drop_index("ix_gastos_tenant_data", table_name="gastos")
+    op.drop_table("resumos_mensais")
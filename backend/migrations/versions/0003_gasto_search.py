@@ -0,0 +1,92 @@
+"""full-text search over gasto descriptions
+
+SQLite: external-content FTS5 table keyed by the gastos rowid, synced by
+triggers. Batch operations that recreate the gastos table drop the triggers
+and renumber rowids; recreate them and run `python -m app.cli.search rebuild`
+afterwards (also after VACUUM).
+
+Postgres: accent-insensitive Portuguese text search configuration, a
+generated tsvector column and a GIN index.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE gastos_fts USING fts5(
+        descricao,
+        content='gastos',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER gastos_fts_insert AFTER INSERT ON gastos BEGIN
+        INSERT INTO gastos_fts(rowid, descricao) VALUES (new.rowid, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_delete AFTER DELETE ON gastos BEGIN
+        INSERT INTO gastos_fts(gastos_fts, rowid, descricao) VALUES ('delete', old.rowid, old.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_update AFTER UPDATE OF descricao ON gastos BEGIN
+        INSERT INTO gastos_fts(gastos_fts, rowid, descricao) VALUES ('delete', old.rowid, old.descricao);
+        INSERT INTO gastos_fts(rowid, descricao) VALUES (new.rowid, new.descricao);
+    END
+    """,
+    "INSERT INTO gastos_fts(gastos_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS gastos_fts_update",
+    "DROP TRIGGER IF EXISTS gastos_fts_delete",
+    "DROP TRIGGER IF EXISTS gastos_fts_insert",
+    "DROP TABLE IF EXISTS gastos_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION public.portuguese_unaccent (COPY = pg_catalog.portuguese)",
+    """
+    ALTER TEXT SEARCH CONFIGURATION public.portuguese_unaccent
+        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem
+    """,
+    """
+    ALTER TABLE gastos ADD COLUMN descricao_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('public.portuguese_unaccent'::regconfig, coalesce(descricao, ''))) STORED
+    """,
+    "CREATE INDEX ix_gastos_descricao_tsv ON gastos USING gin (descricao_tsv)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_gastos_descricao_tsv",
+    "ALTER TABLE gastos DROP COLUMN IF EXISTS descricao_tsv",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS public.portuguese_unaccent",
+]
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_UPGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_UPGRADE)
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_DOWNGRADE)
@@ -0,0 +1,29 @@
+"""indexes behind the gastos foreign key actions
+
+With foreign keys enforced on SQLite, deleting a grupo or categoria looks up
+the gastos pointing at it (ON DELETE SET NULL). These partial indexes serve
+that lookup; the tenant-scoped composites cannot, as tenant_id leads them.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    for column in ("grupo_id", "categoria_id"):
+        where = sa.text(f"{column} IS NOT NULL")
+        op.create_index(
+            f"ix_gastos_{column.removesuffix('_id')}", "gastos", [column],
+            sqlite_where=where, postgresql_where=where
+        )
+
+def downgrade():
+    op.drop_index("ix_gastos_categoria", table_name="gastos")
+    op.drop_index("ix_gastos_grupo", table_name="gastos")
@@ -0,0 +1,44 @@
+"""unique rollup buckets, so concurrent first writes upsert the same row
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+BUCKET = "tenant_id, ano_mes, coalesce(categoria_id, ''), coalesce(grupo_id, '')"
+
+def upgrade():
+    # Fold duplicate buckets into the first row of each before enforcing the key
+    op.execute(f"""
+        UPDATE resumos_mensais SET
+            total = (SELECT sum(d.total) FROM resumos_mensais d
+                     WHERE (d.tenant_id, d.ano_mes, coalesce(d.categoria_id, ''), coalesce(d.grupo_id, ''))
+                         = (resumos_mensais.tenant_id, resumos_mensais.ano_mes,
+                            coalesce(resumos_mensais.categoria_id, ''), coalesce(resumos_mensais.grupo_id, ''))),
+            quantidade = (SELECT sum(d.quantidade) FROM resumos_mensais d
+                          WHERE (d.tenant_id, d.ano_mes, coalesce(d.categoria_id, ''), coalesce(d.grupo_id, ''))
+                              = (resumos_mensais.tenant_id, resumos_mensais.ano_mes,
+                                 coalesce(resumos_mensais.categoria_id, ''), coalesce(resumos_mensais.grupo_id, '')))
+        WHERE id IN (SELECT min(id) FROM resumos_mensais GROUP BY {BUCKET} HAVING count(*) > 1)
+    """)
+    op.execute(f"""
+        DELETE FROM resumos_mensais
+        WHERE id NOT IN (SELECT min(id) FROM resumos_mensais GROUP BY {BUCKET})
+    """)
+    op.drop_index("ix_resumos_mensais_chave", table_name="resumos_mensais")
+    op.create_index(
+        "uq_resumos_mensais_chave", "resumos_mensais",
+        ["tenant_id", "ano_mes", sa.text("coalesce(categoria_id, '')"), sa.text("coalesce(grupo_id, '')")],
+        unique=True
+    )
+
+def downgrade():
+    op.drop_index("uq_resumos_mensais_chave", table_name="resumos_mensais")
+    op.create_index("ix_resumos_mensais_chave", "resumos_mensais", ["tenant_id", "ano_mes", "categoria_id", "grupo_id"])
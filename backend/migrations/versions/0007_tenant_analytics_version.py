@@ -0,0 +1,20 @@
+"""per-tenant write counter for the analytics cache
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("tenants", sa.Column("analytics_version", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade():
+    with op.batch_alter_table("tenants") as batch:
+        batch.drop_column("analytics_version")
@@ -0,0 +1,99 @@
+"""key the SQLite search index by gasto id instead of the gastos rowid
+
+The gastos rowid is implicit (the primary key is a string), so VACUUM and
+batch migrations renumber it and the external-content table of 0003 then
+pointed at the wrong gastos. gastos_fts now stores its own copy of the
+description with the gasto id as an UNINDEXED column; gastos_fts_ids maps
+gasto ids to FTS rows for the triggers. Later batch migrations that
+recreate gastos must recreate the triggers too (app.services.search.SQLITE_TRIGGERS).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS gastos_fts_update",
+    "DROP TRIGGER IF EXISTS gastos_fts_delete",
+    "DROP TRIGGER IF EXISTS gastos_fts_insert",
+]
+
+UPGRADE = DROP_TRIGGERS + [
+    "DROP TABLE gastos_fts",
+    """
+    CREATE VIRTUAL TABLE gastos_fts USING fts5(
+        gasto_id UNINDEXED,
+        descricao,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    "CREATE TABLE gastos_fts_ids (gasto_id VARCHAR(36) PRIMARY KEY, fts_rowid INTEGER NOT NULL) WITHOUT ROWID",
+    """
+    CREATE TRIGGER gastos_fts_insert AFTER INSERT ON gastos BEGIN
+        INSERT INTO gastos_fts(gasto_id, descricao) VALUES (new.id, new.descricao);
+        INSERT INTO gastos_fts_ids(gasto_id, fts_rowid) VALUES (new.id, last_insert_rowid());
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_delete AFTER DELETE ON gastos BEGIN
+        DELETE FROM gastos_fts WHERE rowid = (SELECT fts_rowid FROM gastos_fts_ids WHERE gasto_id = old.id);
+        DELETE FROM gastos_fts_ids WHERE gasto_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_update AFTER UPDATE OF descricao ON gastos BEGIN
+        UPDATE gastos_fts SET descricao = new.descricao
+        WHERE rowid = (SELECT fts_rowid FROM gastos_fts_ids WHERE gasto_id = new.id);
+    END
+    """,
+    "INSERT INTO gastos_fts(gasto_id, descricao) SELECT id, descricao FROM gastos",
+    "INSERT INTO gastos_fts_ids(gasto_id, fts_rowid) SELECT gasto_id, rowid FROM gastos_fts",
+]
+
+# Back to the external-content table of 0003
+DOWNGRADE = DROP_TRIGGERS + [
+    "DROP TABLE gastos_fts_ids",
+    "DROP TABLE gastos_fts",
+    """
+    CREATE VIRTUAL TABLE gastos_fts USING fts5(
+        descricao,
+        content='gastos',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER gastos_fts_insert AFTER INSERT ON gastos BEGIN
+        INSERT INTO gastos_fts(rowid, descricao) VALUES (new.rowid, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_delete AFTER DELETE ON gastos BEGIN
+        INSERT INTO gastos_fts(gastos_fts, rowid, descricao) VALUES ('delete', old.rowid, old.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER gastos_fts_update AFTER UPDATE OF descricao ON gastos BEGIN
+        INSERT INTO gastos_fts(gastos_fts, rowid, descricao) VALUES ('delete', old.rowid, old.descricao);
+        INSERT INTO gastos_fts(rowid, descricao) VALUES (new.rowid, new.descricao);
+    END
+    """,
+    "INSERT INTO gastos_fts(gastos_fts) VALUES ('rebuild')",
+]
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        _run(UPGRADE)
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        _run(DOWNGRADE)